@@ -0,0 +1,74 @@
+import sys
+import os
+import time
+from multiprocessing import Pipe
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+from world import World
+from room import Room
+
+# Cost of sending one room state to everyone in a room, for growing rooms.
+# "per actor" is the old path, which locks and pickles once per recipient;
+# "once" pickles once and writes the same bytes to every connection.
+
+ROOM_SIZES = [8, 50, 100, 200, 400]
+REPEATS = 200
+
+class BenchWorld(World):
+    def setup(self):
+        pass
+
+    def turn_based_loop(self):
+        pass
+
+    def real_time_loop(self):
+        pass
+
+    def cleanup(self):
+        pass
+
+def populate(world: World, size: int) -> list:
+    """
+    Puts size actors in the default room, and returns their ends of the Pipes.
+    """
+    ends = []
+
+    for i in range(size):
+        name = f"NPC {i}"
+        world_conn, actor_conn = Pipe()
+        world.actors[name] = {"name": name, "conn": world_conn, "room": world.default_room.name}
+        world.default_room.add_actor({"name": name, "description": "The most generic person imaginable.", "status": "alive"})
+        ends.append(actor_conn)
+
+    return ends
+
+def bench(world: World, ends: list, send) -> float:
+    total = 0
+
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        send()
+        total += time.perf_counter() - start
+
+        # drain outside the timer, so no pipe ever fills up
+        for end in ends:
+            end.recv_bytes()
+
+    return total / REPEATS * 1_000_000
+
+def per_actor(world: World):
+    message = world.default_room.state()
+    for actor in world.default_room.actors:
+        world.send_to_actor(actor, message, "room")
+
+if __name__ == "__main__":
+    print(f"{'actors':>7} {'per actor (us)':>15} {'once (us)':>10} {'speedup':>8}")
+
+    for size in ROOM_SIZES:
+        world = BenchWorld(default_room=Room(), listen=False)
+        ends = populate(world, size)
+
+        old_us = bench(world, ends, lambda: per_actor(world))
+        new_us = bench(world, ends, lambda: world.send_to_room(world.default_room.name, world.default_room.state(), "room", verbose=False))
+
+        print(f"{size:>7} {old_us:>15.0f} {new_us:>10.0f} {old_us / new_us:>7.1f}x")
@@ -0,0 +1,49 @@
+import sys
+import os
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+from context import WindowContext, TokenWindowContext
+
+# Append/trim cost per message, for growing context limits.
+# Both contexts should stay flat as the limit grows; the old list-slicing
+# trim is included for comparison, and grows with the limit.
+
+LIMITS = [50, 500, 5_000, 50_000]
+MESSAGE = {"role": "user", "content": "Luna says, \"I saw Kael near the well last night, and he looked nervous.\""}
+
+def list_window(limit):
+    """
+    The old WindowContext: a list, re-sliced every time it overflows.
+    """
+    context = []
+    keep = limit - 1
+
+    def append():
+        nonlocal context
+        context.append(MESSAGE)
+        if len(context) > limit:
+            context = context[len(context) - keep:]
+
+    return append
+
+def bench(append, limit) -> float:
+    # fill up first, so every measured append also trims
+    for _ in range(limit):
+        append()
+
+    count = 100_000
+    return timeit.timeit(append, number=count) / count * 1_000_000_000
+
+if __name__ == "__main__":
+    print(f"{'limit':>8} {'list (ns)':>12} {'window (ns)':>12} {'tokens (ns)':>12}")
+
+    for limit in LIMITS:
+        window = WindowContext(context_limit=limit)
+        tokens = TokenWindowContext(context_limit=limit * 20)
+
+        list_ns = bench(list_window(limit), limit)
+        window_ns = bench(lambda: window.append(MESSAGE), limit)
+        tokens_ns = bench(lambda: tokens.append(MESSAGE), limit)
+
+        print(f"{limit:>8} {list_ns:>12.0f} {window_ns:>12.0f} {tokens_ns:>12.0f}")
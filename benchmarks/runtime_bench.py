@@ -0,0 +1,105 @@
+import sys
+import os
+import time
+from multiprocessing import Event, Queue
+from multiprocessing.connection import Listener
+
+import psutil
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../game'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+from wolfworld import WolfWorld
+from wolfnpc import WolfNPC
+from runtime import ActorRuntime
+
+# Memory and startup time of N concurrent games, with one process per actor
+# versus every game's world and npcs as threads in one process.
+# Games only go as far as every npc connecting, so no model server is needed.
+# Run from the repository root: python3 benchmarks/runtime_bench.py
+
+GAME_COUNTS = [1, 10, 50]
+
+class StartupWorld(WolfWorld):
+    """
+    A WolfWorld that reports when all its players have connected, then hangs up.
+    """
+    def __init__(self, ready: Queue, done: Event, **kwargs):
+        super().__init__(**kwargs)
+        self.ready = ready
+        self.done = done
+
+    def run(self):
+        if self.listener != None:
+            self.connection_loop.start()
+
+        self.wait_for_actors(self.PLAYER_COUNT)
+
+        self.ready.put(time.time())
+        self.done.wait()
+
+        for actor in list(self.actors.values()):
+            actor["conn"].close()
+
+        if self.listener != None:
+            self.listener.close()
+
+def npcs(count: int, address) -> list[WolfNPC]:
+    return [WolfNPC(name=f"NPC {i}", personality="Average.", description="Average.", gender="indeterminate", address=address) for i in range(count)]
+
+def tree_memory() -> tuple[int, int]:
+    """
+    Total resident and proportional set size of this process' children, in bytes.
+    Forked processes share their parent's pages, which RSS counts once per process
+    and PSS splits between them. PSS is Linux only, so falls back to RSS elsewhere.
+    """
+    rss = 0
+    pss = 0
+
+    for child in psutil.Process().children(recursive=True):
+        memory = child.memory_full_info()
+        rss += memory.rss
+        pss += getattr(memory, "pss", memory.rss)
+
+    return rss, pss
+
+def bench(games: int, threaded: bool) -> tuple[float, float, float]:
+    ready = Queue()
+    done = Event()
+    processes = []
+    game_list = []
+
+    start = time.time()
+
+    for _ in range(games):
+        if threaded:
+            world = StartupWorld(ready, done, listen=False)
+            game_list.append((world, npcs(WolfWorld.PLAYER_COUNT, None)))
+        else:
+            listener = Listener(("localhost", 0), backlog=WolfWorld.PLAYER_COUNT)
+            world = StartupWorld(ready, done, listener=listener)
+            processes.append(world)
+            processes += npcs(WolfWorld.PLAYER_COUNT, listener.address)
+
+    if threaded:
+        processes.append(ActorRuntime(game_list))
+
+    for process in processes:
+        process.start()
+
+    last_ready = max(ready.get() for _ in range(games))
+    rss, pss = tree_memory()
+
+    done.set()
+    for process in processes:
+        process.join()
+
+    return last_ready - start, rss / 1024 / 1024, pss / 1024 / 1024
+
+if __name__ == "__main__":
+    print(f"{'games':>6} {'runtime':>8} {'startup (s)':>12} {'rss (MiB)':>10} {'pss (MiB)':>10} {'pss per game (MiB)':>19}")
+
+    for games in GAME_COUNTS:
+        for threaded in [False, True]:
+            startup, rss, pss = bench(games, threaded)
+            runtime = "threads" if threaded else "process"
+            print(f"{games:>6} {runtime:>8} {startup:>12.2f} {rss:>10.0f} {pss:>10.0f} {pss / games:>19.1f}")
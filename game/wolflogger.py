@@ -6,13 +6,13 @@ import csv
 sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
 from utils import CSVLogger
 
-LOG_HEADERS = ["timestamp", "phase", "phase_num", "actor", "role", "strategy", "action", "target", "model", "context_length", "tokens_in", "tokens_out", "total_tokens", "eval_in (s)", "eval_out (s)", "eval_total (s)", "content", "prompt"]
+LOG_HEADERS = ["timestamp", "phase", "phase_num", "actor", "role", "strategy", "action", "target", "model", "context_length", "tokens_in", "tokens_out", "total_tokens", "eval_in (s)", "eval_out (s)", "eval_total (s)", "load (s)", "ttft (s)", "total (s)", "prefill_tokens", "cached_tokens", "shared_prefix_tokens_est", "cache", "cache_hits", "cache_misses", "retries", "prefill_saved (s)", "sections_rebuilt", "sections_reused", "parse_failures", "content", "prompt"]
 
 class WolfLogger(CSVLogger):
     def __init__(self, experiment, seed = 1234):
         super().__init__(seed, f"{experiment}", "logs", LOG_HEADERS)
     
-    def log(self, actor = "", action = "", content =  "", target = "", phase = "", phase_num = "", model="", tokens_in = 0, tokens_out = 0, eval_in = 0, eval_out = 0, strategy="", role="", prompt="", context_length = 0):
+    def log(self, actor = "", action = "", content =  "", target = "", phase = "", phase_num = "", model="", tokens_in = 0, tokens_out = 0, eval_in = 0, eval_out = 0, strategy="", role="", prompt="", context_length = 0, cache = "", cache_hits = 0, cache_misses = 0, prefill_tokens = 0, cached_tokens = "", shared_prefix_tokens_est = 0, ttft = 0, total_time = 0, load_time = 0, retries = 0, prefill_saved = 0, sections_rebuilt = 0, sections_reused = 0, parse_failures = 0):
         with self.lock:
             with open(self.filepath, 'a', newline='') as f:
                 writer = csv.DictWriter(f, fieldnames=self.headers)
@@ -29,8 +29,40 @@ class WolfLogger(CSVLogger):
                                  "eval_in (s)": eval_in, 
                                  "eval_out (s)": eval_out,
                                  "eval_total (s)": eval_in + eval_out,
+                                 "load (s)": load_time,
+                                 "ttft (s)": ttft,
+                                 "total (s)": total_time,
+                                 "prefill_tokens": prefill_tokens,
+                                 "cached_tokens": cached_tokens,
+                                 "shared_prefix_tokens_est": shared_prefix_tokens_est,
+                                 "cache": cache,
+                                 "cache_hits": cache_hits,
+                                 "cache_misses": cache_misses,
+                                 "retries": retries,
+                                 "prefill_saved (s)": prefill_saved,
+                                 "sections_rebuilt": sections_rebuilt,
+                                 "sections_reused": sections_reused,
+                                 "parse_failures": parse_failures,
                                  "model": model,
                                  "strategy": strategy,
                                  "role": role,
                                  "prompt": prompt,
-                                 "context_length": context_length})
\ No newline at end of file
+                                 "context_length": context_length})
+
+def recorded_seed(path: str) -> int | None:
+    """
+    Returns the game seed a WolfLogger csv recorded in its start_game row, or
+    None if it was logged before the seed was.
+
+    Args:
+        path (str): a WolfLogger csv
+    """
+    with open(path, mode='r', newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            if row["actor"] == "World" and row["action"] == "start_game":
+                try:
+                    return int(row["content"])
+                except ValueError:
+                    return None
+
+    return None
@@ -12,6 +12,26 @@ class WolfNPC(NPC):
     SEER_STRAT = "If you receive a vision of a werewolf, try to convince the village to lynch them."
     VILLAGE_STRAT = "Deduce who the werewolf(s) are to lynch them. If the seer lives and you trust them, use their vision to help guide the vote. Make note of anyone suspicious."
 
+    SECTION_INPUTS = {
+        "role": ["identity", "strategy", "team", "stay"],
+        "phase": ["phase", "strategy"],
+        "room": ["room"],
+        "vote_targets": ["vote_targets"],
+        "vote_state": ["vote_state"],
+        "team": ["team"],
+        "summary": ["summary", "system"],
+        "strategy": ["summary", "system"]
+    }
+
+    SECTION_PARTS = {
+        "character_sheet": {"identity", "phase", "room", "vote_targets", "vote_state", "strategy", "team"},
+        "static_sheet": {"identity", "strategy", "team"},
+        "state_sheet": {"phase", "room", "vote_targets", "vote_state"},
+        "system": {"character_sheet"},
+        "prefix_system": {"static_sheet"},
+        "state": {"state_sheet", "stay"}
+    }
+
     def __init__(self, 
                  name, 
                  personality, 
@@ -24,8 +44,17 @@ class WolfNPC(NPC):
                  csv_logger = None, 
                  strategy="summary",
                  seed=1234,
-                 address=DEFAULT_ADDRESS):
-        super().__init__(name, personality, "no goal", description, True, gender, game_model, summary_model, True, logger, csv_logger, strategy, seed, address=address)
+                 address=DEFAULT_ADDRESS,
+                 broker=None,
+                 cache_path=None,
+                 replay=None,
+                 replay_latency="zero",
+                 prompt_layout="classic",
+                 turn_based=True,
+                 pacing=False,
+                 game=None,
+                 authkey=None):
+        super().__init__(name, personality, "no goal", description, True, gender, game_model, summary_model, turn_based, logger, csv_logger, strategy, seed, address=address, broker=broker, cache_path=cache_path, replay=replay, replay_latency=replay_latency, prompt_layout=prompt_layout, pacing=pacing, game=game, authkey=authkey)
 
         with open(f'game/{sys_message_file}', 'r', encoding='utf-8') as file:
             self.SYSTEM_MESSAGE = file.read()
@@ -34,14 +63,68 @@ class WolfNPC(NPC):
         """
         Returns a character sheet, for use in LLM contexts.
         """
+        return self.section("character_sheet", lambda: "CHARACTER SHEET:\n" + "\n".join([
+            self.section("identity", self.identity_section),
+            self.section("phase", self.phase_section),
+            self.section("room", self.room_section),
+            self.section("vote_targets", self.vote_targets_section),
+            self.section("vote_state", self.vote_state_section),
+            self.section("strategy", self.strategy_section),
+            self.section("team", self.team_section)
+        ]))
+
+    def static_sheet(self) -> str:
+        """
+        The parts of the character sheet that only change with role or phase.
+        """
+        return self.section("static_sheet", lambda: "CHARACTER SHEET:\n" + "\n".join([
+            self.section("identity", self.identity_section),
+            self.section("strategy", self.strategy_section),
+            self.section("team", self.team_section)
+        ]))
 
+    def state_sheet(self) -> str:
+        """
+        The parts of the character sheet that change from turn to turn.
+        """
+        return self.section("state_sheet", lambda: "CURRENT STATE:\n" + "\n".join([
+            self.section("phase", self.phase_section),
+            self.section("room", self.room_section),
+            self.section("vote_targets", self.vote_targets_section),
+            self.section("vote_state", self.vote_state_section)
+        ]))
+
+    def identity_section(self) -> str:
         if self.role == "werewolf":
             goal = "kill all the villagers"
-            other_wolves = f"Your Team:\n{self.teammates}"
-        elif self.role in ["seer", "villager"]:
+        else:
             goal = "survive, lynch all werewolves"
-            other_wolves = ""
 
+        return f"""Name: {self.name}
+Role: {self.role}
+Personality: {self.personality}
+Description: {self.description}
+Goal: {goal}
+"""
+
+    def phase_section(self) -> str:
+        return f"Current Phase: {self.phase}\n"
+
+    def room_section(self) -> str:
+        return f"""You are currently in a room named: {self.room_info['name']}
+{self.room_info['description']}
+
+People in the room are:
+{self.room_info['actors']}
+"""
+
+    def vote_targets_section(self) -> str:
+        return f"Valid vote targets are:\n{self.vote_targets}\n"
+
+    def vote_state_section(self) -> str:
+        return f"The current vote state is:\n{self.vote_state}\n"
+
+    def strategy_section(self) -> str:
         if self.role == "werewolf" and self.phase == "day":
             strategy = self.WOLF_DAY
         elif self.role == "werewolf":
@@ -51,48 +134,75 @@ class WolfNPC(NPC):
         else:
             strategy = self.VILLAGE_STRAT
 
-        desc = f"""CHARACTER SHEET:
-Name: {self.name}
-Role: {self.role}
-Personality: {self.personality}
-Description: {self.description}
-Goal: {goal}
+        return f"General strategy:\n{strategy}\n"
 
-Current Phase: {self.phase}
+    def team_section(self) -> str:
+        if self.role == "werewolf":
+            return f"Your Team:\n{self.teammates}\n"
+        return "\n"
 
-You are currently in a room named: {self.room_info['name']}
-{self.room_info['description']}
+    def stay_in_character(self) -> str:
+        return f"Stay in character as {self.name}, the {self.role}."
 
-People in the room are:
-{self.room_info['actors']}
+    def retrieval_query(self) -> str:
+        """
+        What the retrieval strategy looks for in memory: the phase, who can be
+        voted for, how people are voting, and what was just said.
+        """
+        query = [self.phase, self.role, " ".join(self.vote_targets)]
 
-Valid vote targets are:
-{self.vote_targets}
+        if self.vote_state:
+            query += [f"{voter} {target}" for voter, target in self.vote_state.items() if target]
 
-The current vote state is:
-{self.vote_state}
+        query += [message["content"] for message in self.context.view()]
 
-General strategy:
-{strategy}
+        return " ".join(query)
 
-{other_wolves}
-"""
-        return desc
+    def memories(self) -> str:
+        return "\n".join(self.context.retrieve(self.retrieval_query())) or "Nothing comes to mind."
+
+    def gen_prefix_prompt(self):
+        """
+        Static system message, then memory, then the volatile state at the end.
+        """
+        prompt = [{"role": "system", "content": self.section("prefix_system", lambda: self.SYSTEM_MESSAGE + self.static_sheet())}]
+
+        if self.strategy == "summary":
+            prompt.append({"role": "system", "content": self.section("summary", lambda: "Current Summary:\n" + self.context.summary)})
+
+        prompt.extend(self.context.view())
+
+        # retrieved memories change every turn, so they go after the context
+        if self.strategy == "retrieval":
+            prompt.append({"role": "system", "content": "Relevant Memories:\n" + self.memories()})
+
+        prompt.append({"role": "system", "content": self.section("state", lambda: self.state_sheet() + "\n" + self.section("stay", self.stay_in_character))})
+
+        return prompt
+
+    def system_section(self) -> str:
+        if self.strategy == "summary":
+            return self.SYSTEM_MESSAGE + self.character_sheet() + "\nCurrent Summary:\n" + self.context.summary
+        return self.SYSTEM_MESSAGE + self.character_sheet()
     
     def gen_system_prompt(self):
 
-        if self.strategy == "summary":
-            prompt = [
-                {"role": "system", "content": self.SYSTEM_MESSAGE + self.character_sheet() + "\nCurrent Summary:\n" + self.context.summary}
-            ] + self.context.context
-        else:
-            prompt = [
-                {"role": "system", "content": self.SYSTEM_MESSAGE + self.character_sheet()}
-            ] + self.context.context
+        if self.prompt_layout == "prefix":
+            return self.gen_prefix_prompt()
+
+        system = self.section("system", self.system_section)
+
+        # retrieved memories change every turn, so they're never cached
+        if self.strategy == "retrieval":
+            system += "\nRelevant Memories:\n" + self.memories()
+
+        prompt = [{"role": "system", "content": system}]
+
+        prompt.extend(self.context.view())
 
         #prompt.append({"role": "system", "content": self.character_sheet()})
 
-        prompt.append({"role": "system", "content": f"Stay in character as {self.name}, the {self.role}."})
+        prompt.append({"role": "system", "content": self.section("stay", self.stay_in_character)})
 
         return prompt
 
@@ -6,12 +6,16 @@ import time
 import sys
 import os
 import csv
+import json
+from threading import Condition
 from datetime import datetime
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
 from utils import CSVLogger
 from world import World
 from room import Room, load_room
+from llm import LLM
+from residency import ModelResidency
 
 from speech import SpeakingContest
 from colorama import Fore, Style
@@ -39,20 +43,24 @@ class WolfWorld(World):
     NIGHT_PHASE_LENGTH = 60
     DAY_PHASE_LENGTH = 120
     NOTIFY_PERIOD = 30
+    TIME_SLICE = 2 # seconds of actions collected and resolved together
 
     #turn-based mode
     NIGHT_ROUNDS = 4
     DAY_ROUNDS = 4
 
+    SUMMARY_TIMEOUT = 1800 # seconds to wait on a summary before giving up on it
+    MAX_SUMMARIES = 2 # summaries in flight at once, so the summary model isn't swamped
 
-    def __init__(self, cli: Connection = None, csv_logger = None, txt_logger = None, wolf_strategy="window", village_strategy="window", seed=1234, listener=None):
+
+    def __init__(self, cli: Connection = None, csv_logger = None, txt_logger = None, wolf_strategy="window", village_strategy="window", seed=1234, listener=None, llm: LLM = None, turn_timeout = World.TURN_TIMEOUT, residency: ModelResidency = None, pipeline = False, listen = True, headless = False, turn_based = True, characters = None, npc_settings = None, max_summaries = MAX_SUMMARIES, authkey: bytes = None):
 
         self.day_room = load_room("game/tavern.json")
         self.night_room = load_room("game/cave.json")
 
         # note to self: I init to the day room because then the villagers don't
         # start in the hideout... haha
-        super().__init__(cli = cli, default_room=self.day_room, turn_based=True, csv_logger=csv_logger, txt_logger=txt_logger, seed=seed, listener=listener)
+        super().__init__(llm = llm, cli = cli, default_room=self.day_room, turn_based=turn_based, csv_logger=csv_logger, txt_logger=txt_logger, seed=seed, listener=listener, turn_timeout=turn_timeout, pipeline=pipeline, listen=listen, headless=headless, characters=characters, npc_settings=npc_settings, authkey=authkey)
 
         self.csv_logger = csv_logger
         self.rooms[self.night_room.name] = self.night_room
@@ -65,14 +73,23 @@ class WolfWorld(World):
         self.seer_alive = True
         self.werewolves = []
 
+        # summaries run at most max_summaries at a time, in the next phase's turn order
+        self.max_summaries = max_summaries
+        self.summary_lock = Condition()
+        self.summary_queue = []         # [(actor, time queued)], waiting for a free slot
+        self.pending_summaries = {}     # actor -> (time queued, time sent), in flight
+        self.turn_order = []
+        self.phase_inference = 0        # seconds of inference reported by actions this phase
+        self.residency = residency
+        if self.residency:
+            self.residency.log = self.log_model_load
+
     ### CORE FUNCTIONALITY (ABSTRACT METHODS)
     def setup(self):
-        while True:
-            with self.actors_lock:
-                if len(self.actors) == self.PLAYER_COUNT:
-                    self.accept_connections = False
-                    break
-            time.sleep(1)
+        self.wait_for_actors(self.PLAYER_COUNT)
+
+        # roles, turn order and vote targets follow self.actors, so it mustn't depend on who connected first
+        self.sort_actors()
 
         roles = ["werewolf"] * self.NUM_WOLVES + ["villager"] * (self.PLAYER_COUNT - self.NUM_WOLVES - 1) + ["seer"]
         random.shuffle(roles)
@@ -92,8 +109,7 @@ class WolfWorld(World):
                 self.werewolves.append(actor)
             elif normalize_role(role) == "villager":
                 self.send_strategy_message(actor, self.village_strategy)
-            colour = role_colour(role)
-            roles_message += f"\n{actor} is a " + colour + role + Style.RESET_ALL + f": {self.actors[actor]['description']}"
+            roles_message += f"\n{actor} is a " + self.paint(role, role_colour(role)) + f": {self.actors[actor]['description']}"
             
             if role != "seer":
                 self.seer_targets[actor] = role
@@ -102,6 +118,14 @@ class WolfWorld(World):
             self.send_team_message(werewolf, self.werewolves)
 
         self.log(roles_message)
+
+        # a model server that isn't up shouldn't stop the game; the npcs will report their own failures
+        if self.residency:
+            try:
+                self.residency.warm_up()
+            except Exception as e:
+                self.logger.warning(f"Failed to warm up models: {e}")
+
         self.phase_header()
 
         for actor in self.actors:
@@ -115,22 +139,21 @@ class WolfWorld(World):
         self.reset_votes()
         self.awaken_room(self.night_room.name)  
 
-        self.log_csv(action="start_game")
+        # the seed, so a replay of this log can deal the same roles and turn order
+        self.log_csv(action="start_game", content=str(self.seed))
+        self.reset_timer()
+        self.plan_turn_order()
         
     def turn_based_loop(self):
 
         while not self.end:
 
-            turn_order = []
+            turn_order = self.turn_order
             vote_result = None
 
             if self.phase == "night":
-                turn_order = [actor for actor in self.actors if self.actors[actor]["role"] == "werewolf"]
-                random.shuffle(turn_order)
                 num_rounds = self.NIGHT_ROUNDS
             else:
-                turn_order = [actor for actor in self.actors]
-                random.shuffle(turn_order)
                 num_rounds = self.DAY_ROUNDS
 
             for round in range(1, num_rounds+1):
@@ -149,57 +172,202 @@ class WolfWorld(World):
                 if round_message:
                     self.send_to_room(self.current_room, {"role": "system", "content": round_message})
 
-                for name in turn_order:
+                for i, name in enumerate(turn_order):
                     actor = self.actors[name]
 
                     colour = role_colour(actor["role"])
 
-                    self.send_act_token(name)
+                    self.wait_for_summary(name)
+
+                    if self.end:
+                        break
+
+                    turn = self.send_act_token(name)
                     self.log_csv(action="send_act_token", target=name)
 
-                    msg = actor["conn"].recv()
+                    # the next actor warms their prompt while this one generates
+                    if self.pipeline and len(turn_order) > 1:
+                        self.send_prefill_message(turn_order[(i + 1) % len(turn_order)])
+
+                    msg = self.await_action(name, turn)
+
+                    if self.end:
+                        break
+
+                    # a hung or failed actor forfeits the turn, so the game keeps moving
+                    if msg == None:
+                        self.log_csv(actor=name, action="timeout", role=self.actors[name]["role"])
+                        msg = {"action": "pass"}
+
+                    self.phase_inference += msg.get("inference_time", 0)
 
                     #print(msg)
 
                     if msg["action"] == "speak":
-                        try:
-                            reason = msg["reason"]
-                        except:
-                            reason = None
-
-                        self.speak(name, msg["content"], colour, reason=reason)
+                        self.speak(name, msg["content"], colour, reason=msg.get("reason"))
                         self.log_csv(actor=name, action="speak", content=msg["content"], role=self.actors[name]["role"])
 
                     if msg["action"] == "vote":
-                        if actor["name"] != msg["content"] and msg["content"] != self.voters[actor["name"]] and msg["content"] in self.valid_vote_targets:
-                            self.vote(name, msg["content"], msg["reason"])
-                            self.log_csv(actor=name, action="vote", target=msg["content"], role=self.actors[name]["role"])
+                        if self.cast_vote(name, msg["content"], msg.get("reason")):
                             vote_result = self.resolve_majority_vote()
                             if vote_result:
                                 break
                         else:
-                            self.send_to_actor(name, {"role": "system", "content": "ERROR processing your vote! You must provide a single name, example: 'Bob', you may not vote for yourself, and you may not vote for the same target twice."})
                             self.send_to_room(self.current_room, {"role": "user", "content": f"{name} is quiet."})
 
                     if msg["action"] == "pass":
                         self.send_to_room(self.current_room, {"role": "user", "content": f"{name} is quiet."})
 
                 # after everyone has acted, if a vote has passed, end the phase.
-                if vote_result:
+                if vote_result or self.end:
                     break
+
+            # the game was stopped early, so the phase has no result
+            if self.end:
+                break
             
             # force a tiebreaker at night
             if not vote_result and self.phase == "night":
                 vote_result = self.resolve_majority_vote(tiebreaker=True)
 
-            self.end = self.phase_change(vote_result)
+            # an abort during the phase change (e.g. from a summary) must stick
+            self.end = self.phase_change(vote_result) or self.end
         
-            time.sleep(self.WAIT_TIME)
+            self.pause(self.WAIT_TIME)
 
     def real_time_loop(self):
-        pass
+        """
+        Every awake NPC acts whenever it likes, so their requests run concurrently.
+        Actions are collected in TIME_SLICE windows and resolved together: of the
+        people speaking at once in a room, the most charismatic is heard, and the
+        rest are interrupted.
+        """
+        while not self.end:
+
+            vote_result = None
+
+            if self.phase == "night":
+                phase_length = self.NIGHT_PHASE_LENGTH
+            else:
+                phase_length = self.DAY_PHASE_LENGTH
+
+            while not vote_result and not self.end and time.time() - self.phase_start_time < phase_length:
+                messages = self.collect_slice(min(self.TIME_SLICE, self.phase_start_time + phase_length - time.time()))
+                vote_result = self.resolve_slice(messages)
+                self.notify_time_left(phase_length)
+
+            # the game was stopped early, so the phase has no result
+            if self.end:
+                break
+
+            # force a tiebreaker at night
+            if not vote_result and self.phase == "night":
+                vote_result = self.resolve_majority_vote(tiebreaker=True)
+
+            # an abort during the phase change (e.g. from a summary) must stick
+            self.end = self.phase_change(vote_result) or self.end
+
+            self.pause(self.WAIT_TIME)
+
+    def collect_slice(self, length: float) -> list[dict]:
+        """
+        Gathers every action that arrives in the next length seconds.
+        """
+        deadline = time.time() + length
+        messages = []
+
+        while time.time() < deadline:
+            messages += self.get_new_messages(timeout=deadline - time.time())
+
+        return messages
+
+    def resolve_slice(self, messages: list[dict]) -> str | None:
+        """
+        Resolves one time slice of actions.
+
+        Returns:
+            str: the vote result, if a vote passed
+        """
+        contests = {}
+        vote_result = None
+
+        # nobody gets to win ties just by answering first
+        random.shuffle(messages)
+
+        for msg in messages:
+            name = msg["actor"]
+
+            if name not in self.actors:
+                continue
+
+            self.phase_inference += msg.get("inference_time", 0)
+            action = msg.get("action")
+
+            # generated before the phase changed
+            if msg.get("phase", self.phase) != self.phase:
+                self.log_csv(actor=name, action="stale_action", content=str(msg), role=self.actors[name]["role"])
+                continue
+
+            role = self.actors[name]["role"]
+            content = msg.get("content")
+
+            if action == "speak" and content and content != "...":
+                room = self.actors[name]["room"]
+                contests.setdefault(room, SpeakingContest()).add_speaker(name, content, self.actors[name]["charisma"], None if self.headless else role_colour(role))
+                self.log_csv(actor=name, action="speak", content=content, role=role)
+            elif action == "yell" and content:
+                self.yell(name, content, role_colour(role))
+                self.log_csv(actor=name, action="yell", content=content, role=role)
+            elif action == "gesture" and content:
+                self.gesture(name, content)
+                self.log_csv(actor=name, action="gesture", content=content, role=role)
+            elif action == "vote" and not vote_result:
+                if self.cast_vote(name, msg.get("target") or content, msg.get("reason")):
+                    vote_result = self.resolve_majority_vote()
+
+        for room, contest in contests.items():
+            speech_plain, speech_colour, speaker, interrupted = contest.resolve()
+
+            if speaker:
+                self.log(speech_colour or speech_plain)
+                self.send_to_room(room, speech_plain, verbose=False, excludes=[speaker])
+
+            for actor in interrupted:
+                self.send_to_actor(actor, {"role": "system", "content": f"{speaker} spoke over you, and nobody heard what you said."})
+                self.log_csv(actor=actor, action="interrupted", target=speaker, role=self.actors[actor]["role"])
+
+        return vote_result
+
+    def notify_time_left(self, phase_length: float):
+        """
+        Reminds the awake room how long the phase has left, every NOTIFY_PERIOD seconds.
+        """
+        now = time.time()
+
+        if now - self.last_notify >= self.NOTIFY_PERIOD:
+            self.last_notify = now
+            time_left = max(0, int(self.phase_start_time + phase_length - now))
+            self.send_to_room(self.current_room, {"role": "system", "content": f"{time_left} seconds remain in the {self.phase}."})
+
+    def cast_vote(self, name: str, target: str, reason: str) -> bool:
+        """
+        Records a vote, if it's valid.
+
+        Returns:
+            bool: False, after telling the actor why, if the vote wasn't valid
+        """
+        if name != target and target != self.voters.get(name) and target in self.valid_vote_targets:
+            self.vote(name, target, reason)
+            self.log_csv(actor=name, action="vote", target=target, role=self.actors[name]["role"])
+            return True
+
+        self.send_to_actor(name, {"role": "system", "content": "ERROR processing your vote! You must provide a single name, example: 'Bob', you may not vote for yourself, and you may not vote for the same target twice."})
+        return False
 
     def cleanup(self):
+        if self.headless:
+            self.log_csv(action="headless", content=f"{self.skipped_prints} prints and {self.skipped_waits}s of pauses skipped", total_time=self.time_saved())
+
         try:
             self.flagged_actors = self.actors.keys()
             self.clean_flagged_actors()
@@ -223,12 +391,25 @@ class WolfWorld(World):
 
                 #self.logger.info(message)
                 self.send_to_room(self.actors[actor]["room"],{"role": "user", "content": message}, excludes=[actor])
-                self.send_to_room(self.actors[actor]["room"], message=self.voters, type="vote_state", verbose=False)
+                self.send_vote(self.actors[actor]["room"], actor, target)
 
     # HELPER METHODS
 
-    def log_csv(self, actor="World", action="", content="", target="", tokens_in=0, tokens_out=0, eval_in=0, eval_out=0, role=""):
-        self.csv_logger.log(actor=actor, action=action, content=content, target=target, phase=self.phase, phase_num=self.phase_number, tokens_in=tokens_in, tokens_out=tokens_out, eval_in=eval_in, eval_out=eval_out, role=role)
+    def log_csv(self, actor="World", action="", content="", target="", tokens_in=0, tokens_out=0, eval_in=0, eval_out=0, role="", model="", load_time=0, total_time=0):
+        self.csv_logger.log(actor=actor, action=action, content=content, target=target, phase=self.phase, phase_num=self.phase_number, tokens_in=tokens_in, tokens_out=tokens_out, eval_in=eval_in, eval_out=eval_out, role=role, model=model, load_time=load_time, total_time=total_time)
+
+    def log_model_load(self, action: str, model: str, load_time: float, total_time: float):
+        self.log_csv(action=action, model=model, load_time=load_time, total_time=total_time)
+
+    def log_broker_stats(self):
+        """
+        Logs the inference broker's queue depth and per-model throughput, if there is one.
+        """
+        if self.llm and self.llm.broker:
+            try:
+                self.log_csv(action="broker_stats", content=json.dumps(self.llm.broker.stats()))
+            except Exception as e:
+                self.logger.warning(f"Failed to get broker stats: {e}")
 
     def send_phase_message(self, actor: str, phase : str):
         try:
@@ -257,45 +438,168 @@ class WolfWorld(World):
             #print(f"{self.valid_vote_targets}. {self.voters}")
         
         if self.phase == "day":
-            self.send_to_room(self.day_room.name, self.valid_vote_targets, "vote_targets", verbose=False)
-            self.send_to_room(self.day_room.name, message=self.voters, type="vote_state", verbose=False)
-
+            self.send_votes_reset(self.day_room.name)
         else:
-            self.send_to_room(self.night_room.name, self.valid_vote_targets, "vote_targets", verbose = False)
-            self.send_to_room(self.night_room.name, message=self.voters, type="vote_state", verbose=False)
-
-    def force_summary(self): 
+            self.send_votes_reset(self.night_room.name)
+
+    def abort(self, reason: str):
+        """
+        Ends the game early, with no winner.
+        """
+        self.log({"role": "system", "content": reason})
+        self.log_csv(action="abort", content=reason)
+        self.end = True
+
+        # nobody should be left waiting on a summary or an action that won't come
+        with self.summary_lock:
+            self.summary_lock.notify_all()
+
+        with self.inbox_changed:
+            self.inbox_changed.notify_all()
+
+    def plan_turn_order(self):
+        """
+        Decides the next phase's turn order ahead of time, so the summaries of
+        whoever acts first can run first.
+        """
+        if self.phase == "night":
+            self.turn_order = [actor for actor in self.actors if self.actors[actor]["role"] == "werewolf"]
+        else:
+            self.turn_order = [actor for actor in self.actors]
+        random.shuffle(self.turn_order)
+
+    def start_summaries(self):
+        """
+        Asks every actor who keeps a summary to update it. At most max_summaries
+        run at once, and actors who act first in the turn order go first. Actors
+        summarize in the background during other players' turns, and are only
+        waited on when their own turn comes up (see wait_for_summary).
+        """
         self.log({"role": "system", "content": "Preparing for the next round... Please be patient."})
 
-        summarizing_actors = []
+        if self.residency:
+            self.residency.before_summaries()
+
+        eligible = []
 
         for actor in self.actors:
             if normalize_role((self.actors[actor]["role"]) == "villager" and self.phase_number != 1) or normalize_role(self.actors[actor]["role"]) == "werewolf":
+                # one summary in flight per actor
+                self.wait_for_summary(actor)
+                eligible.append(actor)
+
+        # actors outside the turn order go last
+        eligible.sort(key=lambda actor: self.turn_order.index(actor) if actor in self.turn_order else len(self.turn_order))
+
+        with self.summary_lock:
+            queued = time.time()
+            self.summary_queue += [(actor, queued) for actor in eligible]
+            self.dispatch_summaries()
+
+        # swapping models only pays off if all the summaries run together
+        if self.residency and self.residency.policy == "swap":
+            for actor in eligible:
+                self.wait_for_summary(actor)
+
+        if self.residency:
+            self.residency.after_summaries()
+
+    # NOTE: this is NOT THREAD SAFE, and is intended to be called already within summary_lock
+    def dispatch_summaries(self):
+        """
+        Sends queued summaries out, in order, while there are free slots.
+        """
+        while self.summary_queue and len(self.pending_summaries) < self.max_summaries:
+            actor, queued = self.summary_queue.pop(0)
+
+            if actor in self.actors:
                 self.send_summary_message(actor)
-                summarizing_actors.append(actor)
+                self.pending_summaries[actor] = (queued, time.time())
 
-        while True:
-            ready_actors = []
+    def summary_queued(self, actor: str) -> bool:
+        return any(queued_actor == actor for queued_actor, _ in self.summary_queue)
 
-            for actor in summarizing_actors:
-                response = self.try_recv(self.actors[actor]["conn"])
-                if response:
-                    ready_actors.append(actor)
-                    self.log({"role": "system", "content": f"{actor} is ready!"})
-                
-            summarizing_actors = [name for name in summarizing_actors if name not in ready_actors]
+    def handle_now(self, actor: str, msg: dict) -> bool:
+        # a finished summary frees a slot for the next one, whoever's turn it is
+        if msg.get("action") == "ready":
+            self.summary_ready(actor)
+            return True
 
-            if summarizing_actors == []:
-                break
-            else:
-                time.sleep(1)
+        # playing on would only make up actions the recorded game never had
+        if msg.get("action") == "replay_exhausted":
+            self.abort(f"{actor}'s replay log has run out, so the replay no longer follows the recorded game. Ending it here.")
+            return False
+
+        if msg.get("action") == "leave":
+            with self.summary_lock:
+                self.pending_summaries.pop(actor, None)
+                self.summary_queue = [(queued_actor, queued) for queued_actor, queued in self.summary_queue if queued_actor != actor]
+                self.dispatch_summaries()
+                self.summary_lock.notify_all()
+
+        return super().handle_now(actor, msg)
+
+    def summary_ready(self, actor: str):
+        """
+        Records a finished summary, and starts the next one in the queue.
+        """
+        with self.summary_lock:
+            if actor not in self.pending_summaries:
+                return
+
+            queued, sent = self.pending_summaries.pop(actor)
+            self.dispatch_summaries()
+            self.summary_lock.notify_all()
+
+        self.log({"role": "system", "content": f"{actor} is ready!"})
+
+        # eval_in: time spent queued for a slot, eval_out: time spent summarizing
+        self.log_csv(actor=actor, action="summary", role=self.actors[actor]["role"], eval_in=sent - queued, eval_out=time.time() - sent, total_time=time.time() - queued)
+
+    def wait_for_summary(self, actor: str):
+        """
+        Blocks until the actor's summary is finished, if they have one queued or in progress.
+        """
+        with self.summary_lock:
+            if actor not in self.pending_summaries and not self.summary_queued(actor):
+                return
+
+            start = time.time()
+            done = self.summary_lock.wait_for(lambda: self.end or (actor not in self.pending_summaries and not self.summary_queued(actor)), self.SUMMARY_TIMEOUT)
+
+            if not done:
+                # give up on it, and free its slot
+                self.pending_summaries.pop(actor, None)
+                self.summary_queue = [(queued_actor, queued) for queued_actor, queued in self.summary_queue if queued_actor != actor]
+                self.dispatch_summaries()
+
+        if actor not in self.actors:
+            return
+
+        if not done:
+            self.logger.warning(f"{actor} did not finish their summary in time.")
+            self.log_csv(actor=actor, action="summary_timeout", role=self.actors[actor]["role"])
+
+        # eval_in: how long the game was blocked on this summary
+        self.log_csv(actor=actor, action="summary_wait", role=self.actors[actor]["role"], eval_in=time.time() - start)
 
     def reset_timer(self):
         self.phase_start_time = time.time()
         self.last_notify = self.phase_start_time    
+        self.phase_inference = 0
+
+    def log_utilisation(self):
+        """
+        Logs how busy inference kept the phase: seconds of inference reported by
+        actions, over the phase's wall time. Above 1 means requests overlapped.
+        """
+        wall_time = time.time() - self.phase_start_time
+
+        if wall_time > 0:
+            self.log_csv(action="utilisation", content=f"{self.phase_inference / wall_time:.2f}", eval_in=self.phase_inference, total_time=wall_time)
 
     def phase_header(self):
-        self.log(f"-------------\033[1m{self.phase.upper()} {self.phase_number}: {self.current_room.name.upper()}\033[0m---\n{self.current_room.description}")
+        self.log("-------------" + self.paint(f"{self.phase.upper()} {self.phase_number}: {self.current_room.name.upper()}", Style.BRIGHT) + f"---\n{self.current_room.description}")
 
     def get_wolf_count(self) -> int:
         return sum(1 for actor in self.actors if self.actors[actor]["role"] == "werewolf")
@@ -304,6 +608,8 @@ class WolfWorld(World):
         return sum(1 for actor in self.actors if self.actors[actor]["role"] == "villager" or self.actors[actor]["role"] == "seer")
 
     def phase_change(self, vote_result) -> bool:
+        self.log_utilisation()
+
         if vote_result:
             self.remove(vote_result, "killed")
             if vote_result in self.seer_targets: 
@@ -325,10 +631,10 @@ class WolfWorld(World):
         if wolf_count >= villager_count or wolf_count == 0 or (self.phase == "day" and wolf_count == villager_count):
             if wolf_count == 0:
                 self.log_csv(action="declare_winner", content="village")
-                self.log(Style.BRIGHT + role_colour("villager") + "Villagers win!" + Style.RESET_ALL)
+                self.log(self.paint("Villagers win!", Style.BRIGHT, role_colour("villager")))
             else:
                 self.log_csv(action="declare_winner", content="werewolves")
-                self.log(Style.BRIGHT + role_colour("werewolf") + "Werewolves win!" + Style.RESET_ALL)
+                self.log(self.paint("Werewolves win!", Style.BRIGHT, role_colour("werewolf")))
 
             return True
 
@@ -344,7 +650,9 @@ class WolfWorld(World):
             self.current_room = self.night_room
 
         self.phase_header()
+        self.reset_timer()
         self.log_csv(action="phase_change")
+        self.log_broker_stats()
 
         if vote_result:
             day_message = f"You have met at the village tavern.\n\t{vote_result} was found dead in the morning, as if mauled by a beast."
@@ -388,7 +696,7 @@ class WolfWorld(World):
                     try:
                         target = random.choice(list(self.seer_targets.keys()))
                         self.send_to_actor(actor, {"role": "system", "content": f"Last night, you receieved a vision! {target} is a {self.seer_targets[target]}!"})
-                        self.log(role_colour("seer") + actor + Style.RESET_ALL + f" recieved {target}'s role: " + role_colour(self.seer_targets[target]) + self.seer_targets[target] + Style.RESET_ALL)
+                        self.log(self.paint(actor, role_colour("seer")) + f" recieved {target}'s role: " + self.paint(self.seer_targets[target], role_colour(self.seer_targets[target])))
                         self.log_csv(action="seer_vision", content=f"{target}", target=actor, role=self.seer_targets[target])
                         del self.seer_targets[target]
                     except:
@@ -410,11 +718,12 @@ class WolfWorld(World):
             self.send_phase_message(actor, self.phase)
 
         self.reset_votes()
+        self.plan_turn_order()
 
         # cleanup
         if self.phase == "day":
             self.send_to_room(self.day_room, {"role": "system", "content": day_message})
-            self.force_summary()
+            self.start_summaries()
         else:
             self.send_to_room(self.night_room, {"role": "system", "content": night_message})
 
@@ -0,0 +1,110 @@
+from multiprocessing.connection import Client
+import sys
+import os
+import socket
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'game'))
+from wolflogger import WolfLogger
+from wolfnpc import WolfNPC
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+from utils import create_logger, parse_address
+from broker import InferenceBroker
+from cache import DEFAULT_CACHE_PATH
+
+# Hosts NPCs for a world started elsewhere with "wolf.py --serve host:port".
+# The world decides which characters this worker plays, and how.
+#
+#   python3 npc_worker.py <host:port> -n <npcs> [--authkey <key>] [-b] [-c]
+
+if __name__ == "__main__":
+
+    try:
+        address = parse_address(sys.argv[1])
+    except (IndexError, ValueError):
+        print("Error: the first argument must be the world's host:port.")
+        sys.exit(1)
+
+    if "-n" in sys.argv:
+        try:
+            slots = int(sys.argv[sys.argv.index("-n") + 1])
+        except (IndexError, ValueError):
+            print("Error: -n must be followed by an integer.")
+            sys.exit(1)
+    else:
+        slots = 1
+
+    if "--authkey" in sys.argv:
+        try:
+            authkey = sys.argv[sys.argv.index("--authkey") + 1].encode()
+        except IndexError:
+            print("Error: --authkey must be followed by a key.")
+            sys.exit(1)
+    elif os.environ.get("WOLF_AUTHKEY"):
+        authkey = os.environ["WOLF_AUTHKEY"].encode()
+    else:
+        print("Error: npc_worker.py needs an --authkey, or WOLF_AUTHKEY to be set.")
+        sys.exit(1)
+
+    if "-c" in sys.argv:
+        cache_path = DEFAULT_CACHE_PATH
+    else:
+        cache_path = None
+
+    # this worker's npcs share one broker, in front of this machine's model server
+    if "-b" in sys.argv:
+        broker = InferenceBroker()
+        broker.start()
+        broker_address = broker.address
+    else:
+        broker_address = None
+
+    name = f"{socket.gethostname()}:{os.getpid()}"
+
+    conn = Client(address, authkey=authkey)
+    conn.send({"worker": True, "name": name, "slots": slots})
+    assignment = conn.recv()
+    conn.close()
+
+    characters = assignment["characters"]
+    settings = assignment["settings"]
+
+    if not characters:
+        print("The world has no characters left to assign.")
+        sys.exit(0)
+
+    # logged next to the world's logs, but in a file of this worker's own
+    csv_logger = WolfLogger(f"{settings['experiment']} worker {os.getpid()}", seed=settings["log_seed"])
+    txt_logger = create_logger(f"Worker {os.getpid()}", seed=settings["log_seed"])
+
+    npcs = []
+
+    for npc in characters:
+        bot_player = WolfNPC(name=npc["name"],
+                             personality=npc["personality"],
+                             description=npc["description"],
+                             gender=npc["gender"],
+                             game_model=settings["game_model"],
+                             summary_model=settings["summary_model"],
+                             logger=txt_logger,
+                             csv_logger=csv_logger,
+                             seed=settings["seed"],
+                             address=address,
+                             broker=broker_address,
+                             cache_path=cache_path,
+                             prompt_layout=settings["prompt_layout"],
+                             sys_message_file=settings["sys_message_file"],
+                             turn_based=settings["turn_based"],
+                             pacing=settings["pacing"],
+                             authkey=authkey
+                             )
+        bot_player.start()
+        npcs.append(bot_player)
+
+    print(f"Hosting {[npc['name'] for npc in characters]} for {address[0]}:{address[1]}")
+
+    for bot_player in npcs:
+        bot_player.join()
+
+    if broker_address:
+        broker.terminate()
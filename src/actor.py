@@ -43,8 +43,10 @@ class Actor(Process):
         charisma (Optional[int]): affects speaking priority
         luck (Optional[int]): affects various things
         can_speak (Optional[int]): default True
+        game (Optional[str]): which game to join, when the server hosts several
+        authkey (Optional[bytes]): the server's authentication key
     """
-    def __init__(self, name, personality, goal, description = "The most generic person imaginable.", status = "alive", strength = 10, intelligence = 10, charisma = 10, luck = 10, can_speak = True, gender= "indeterminate", address=DEFAULT_ADDRESS):
+    def __init__(self, name, personality, goal, description = "The most generic person imaginable.", status = "alive", strength = 10, intelligence = 10, charisma = 10, luck = 10, can_speak = True, gender= "indeterminate", address=DEFAULT_ADDRESS, game=None, authkey=None):
         super().__init__()
 
         self.name = name
@@ -69,6 +71,8 @@ class Actor(Process):
         self.conn = None
         self.room_info = {}
         self.address = address
+        self.game = game
+        self.server_authkey = authkey  # not self.authkey, which is the Process' own key
 
     def dict_server(self) -> ActorMessage:
         """
@@ -83,7 +87,8 @@ class Actor(Process):
             "strength": self.strength,
             "intelligence": self.intelligence,
             "charisma": self.charisma,
-            "luck": self.luck
+            "luck": self.luck,
+            "game": self.game
         }
     
     def dict_public(self) -> ActorMessage:
@@ -139,7 +144,7 @@ class Actor(Process):
 
         while self.conn == None and attempt_counter > 0:
             try:    
-                self.conn = Client(self.address)
+                self.conn = Client(self.address, authkey=self.server_authkey)
             except ConnectionRefusedError:
                 time.sleep(1)
                 attempt_counter -= 1    
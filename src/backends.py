@@ -0,0 +1,238 @@
+import csv
+import time
+from abc import ABC, abstractmethod
+from ollama import Client
+from broker import BrokerClient
+
+class Backend(ABC):
+    """
+    Abstract class for whatever actually answers an LLM's prompts.
+
+    Every backend returns a dict with the keys:
+        content (str), reasoning (str | None), tokens_in (int), tokens_out (int),
+        eval_in (float), eval_out (float), ttft (float), total_time (float)
+    and optionally:
+        cached_tokens (int), load_time (float)
+
+    max_tokens caps the response length; prefill requests use it to only warm the prompt cache.
+    """
+
+    SUPPORTS_PREFILL = True
+
+    @abstractmethod
+    def chat(self, model: str, messages: list[dict], enforce_model = None, schema: dict = None, think = False, keep_alive = 0, seed = 1234, max_tokens: int = None) -> dict:
+        pass
+
+class OllamaBackend(Backend):
+    """
+    Local inference with ollama, optionally queued through an InferenceBroker.
+    Responses are streamed so the time to first token can be measured.
+
+    The ollama client is created lazily, so the backend can be created before
+    an Actor process forks.
+
+    Args:
+        broker (tuple): the address of an InferenceBroker - OPTIONAL
+        timeout (float): seconds before a request is abandoned - OPTIONAL
+    """
+    def __init__(self, broker = None, timeout = None):
+        if broker != None:
+            self.broker = BrokerClient(broker, timeout)
+        else:
+            self.broker = None
+
+        self.timeout = timeout
+        self.client = None
+
+    def chat(self, model, messages, enforce_model = None, schema = None, think = False, keep_alive = 0, seed = 1234, max_tokens = None):
+        start = time.perf_counter()
+
+        options = {"seed": seed}
+        if max_tokens != None:
+            options["num_predict"] = max_tokens
+
+        if self.broker:
+            # the broker streams on our behalf
+            response = self.broker.chat(model,
+                                        messages=messages,
+                                        think=False,
+                                        format=schema,
+                                        keep_alive=keep_alive,
+                                        options=options)
+            content = response.message.content
+            thinking = response.message.thinking
+            ttft = self.broker.last_ttft
+        else:
+            if self.client == None:
+                self.client = Client(timeout=self.timeout)
+
+            stream = self.client.chat(model,
+                                      messages=messages,
+                                      think=False,
+                                      format=schema,
+                                      keep_alive=keep_alive,
+                                      options=options,
+                                      stream=True)
+
+            ttft = None
+            content = []
+            thinking = []
+            for chunk in stream:
+                if ttft == None and (chunk.message.content or chunk.message.thinking):
+                    ttft = time.perf_counter() - start
+                content.append(chunk.message.content or "")
+                thinking.append(chunk.message.thinking or "")
+                response = chunk
+
+            content = "".join(content)
+            thinking = "".join(thinking) or None
+
+        total_time = time.perf_counter() - start
+
+        return {
+            "content": content,
+            "reasoning": thinking,
+            "tokens_in": response.prompt_eval_count or 0,
+            "tokens_out": response.eval_count or 0,
+            "eval_in": (response.prompt_eval_duration or 0) / 1_000_000_000,
+            "eval_out": (response.eval_duration or 0) / 1_000_000_000,
+            "load_time": (response.load_duration or 0) / 1_000_000_000,
+            "ttft": ttft or total_time,
+            "total_time": total_time
+        }
+
+class OpenAIBackend(Backend):
+    """
+    Online inference through the openai API. Responses are streamed so the
+    time to first token can be measured; the API doesn't split prompt and
+    generation time, so eval_in is the time to first token and eval_out the rest.
+
+    Args:
+        client (OpenAI): an authenticated client
+    """
+    def __init__(self, client):
+        self.client = client
+
+    def chat(self, model, messages, enforce_model = None, schema = None, think = False, keep_alive = 0, seed = 1234, max_tokens = None):
+        start = time.perf_counter()
+        ttft = None
+
+        kwargs = {}
+        if max_tokens != None:
+            kwargs["max_completion_tokens"] = max_tokens
+
+        if enforce_model:
+            stream = self.client.chat.completions.stream(
+                model = model,
+                messages=messages,
+                response_format=enforce_model,
+                stream_options={"include_usage": True},
+                **kwargs
+            )
+        else:
+            stream = self.client.chat.completions.stream(
+                model = model,
+                messages=messages,
+                stream_options={"include_usage": True},
+                **kwargs
+            )
+
+        with stream as events:
+            for event in events:
+                if ttft == None and event.type == "content.delta":
+                    ttft = time.perf_counter() - start
+            completion = events.get_final_completion()
+
+        total_time = time.perf_counter() - start
+        ttft = ttft or total_time
+
+        usage = completion.usage
+        if usage:
+            tokens_in = usage.prompt_tokens
+            tokens_out = usage.completion_tokens
+            if usage.prompt_tokens_details:
+                cached_tokens = usage.prompt_tokens_details.cached_tokens or 0
+            else:
+                cached_tokens = 0
+        else:
+            tokens_in = 0
+            tokens_out = 0
+            cached_tokens = 0
+
+        return {
+            "content": completion.choices[0].message.content,
+            "reasoning": None,
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+            "cached_tokens": cached_tokens,
+            "eval_in": ttft,
+            "eval_out": total_time - ttft,
+            "ttft": ttft,
+            "total_time": total_time
+        }
+
+class ReplayExhausted(Exception):
+    """
+    Raised when a replayed actor asks for more responses than its log recorded,
+    which means the replay has stopped following the recorded game.
+    """
+    pass
+
+class ReplayBackend(Backend):
+    """
+    Replays the responses an actor received in a logged game, in order, so games
+    can be re-run without a model server.
+
+    Args:
+        path (str): a WolfLogger csv
+        actor (str): whose responses to replay
+        action (str): which logged rows to replay, "prompt" or "summarize"
+        latency (str): "zero" returns immediately, "recorded" sleeps for the logged eval time
+
+    Raises ReplayExhausted once the actor's recorded responses run out.
+    """
+
+    # prefill requests weren't logged, and mustn't use up recorded responses
+    SUPPORTS_PREFILL = False
+
+    def __init__(self, path: str, actor: str, action = "prompt", latency = "zero"):
+        self.path = path
+        self.actor = actor
+        self.action = action
+        self.latency = latency
+        self.rows = None
+
+    def load(self):
+        with open(self.path, mode='r', newline='', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            self.rows = [row for row in reader if row["actor"] == self.actor and row["action"] == self.action]
+        self.rows.reverse()
+
+    def chat(self, model, messages, enforce_model = None, schema = None, think = False, keep_alive = 0, seed = 1234, max_tokens = None):
+        if self.rows == None:
+            self.load()
+
+        if not self.rows:
+            raise ReplayExhausted(f"{self.actor} has no recorded {self.action} responses left in {self.path}")
+
+        row = self.rows.pop()
+
+        eval_in = float(row["eval_in (s)"] or 0)
+        eval_out = float(row["eval_out (s)"] or 0)
+
+        if self.latency == "recorded":
+            time.sleep(eval_in + eval_out)
+            total_time = eval_in + eval_out
+        else:
+            total_time = 0
+
+        return {
+            "content": row["content"],
+            "reasoning": None,
+            "tokens_in": int(row["tokens_in"] or 0),
+            "tokens_out": int(row["tokens_out"] or 0),
+            "eval_in": eval_in,
+            "eval_out": eval_out,
+            "ttft": min(eval_in, total_time),
+            "total_time": total_time
+        }
@@ -0,0 +1,219 @@
+import asyncio
+import time
+import traceback
+from collections import defaultdict
+from multiprocessing import Process
+from multiprocessing.connection import Listener, Client, Connection
+from threading import Thread, Lock
+
+from httpx import Limits
+from ollama import AsyncClient, ChatResponse
+
+BROKER_ADDRESS = ("localhost", 0)
+
+class InferenceBroker(Process):
+    """
+    A shared inference process. Every LLM in the game submits its requests here
+    instead of opening its own client, and the broker forwards them to Ollama
+    from a single asyncio event loop with a pooled HTTP client.
+
+    Args:
+        listener (Listener): where BrokerClients connect - OPTIONAL
+        host (str): the ollama server, defaults to ollama's own default - OPTIONAL
+        max_concurrency (int): the maximum number of requests in flight against the server
+    """
+
+    MAX_CONCURRENCY = 4
+
+    def __init__(self, listener: Listener = None, host: str = None, max_concurrency = MAX_CONCURRENCY):
+        super().__init__(daemon=True)
+
+        if listener == None:
+            self.listener = Listener(BROKER_ADDRESS)
+        else:
+            self.listener = listener
+
+        self.address = self.listener.address
+        self.host = host
+        self.max_concurrency = max_concurrency
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        self.client = AsyncClient(self.host, limits=Limits(max_connections=self.max_concurrency))
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.stats_lock = Lock()
+        self.queued = 0
+        self.in_flight = 0
+        self.models = defaultdict(lambda: {"requests": 0, "errors": 0, "tokens_in": 0, "tokens_out": 0, "eval_in": 0, "eval_out": 0})
+
+        Thread(target=self.connection_loop, daemon=True).start()
+
+        self.loop.run_forever()
+
+    def connection_loop(self):
+        """
+        Accepts BrokerClients, each of which gets its own reader thread.
+        """
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                break
+            Thread(target=self.reader_loop, args=(conn,), daemon=True).start()
+
+    def reader_loop(self, conn: Connection):
+        """
+        Hands every request read from a client to the event loop.
+        """
+        send_lock = Lock()
+
+        while True:
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                break
+
+            if request["type"] == "stats":
+                self.reply(conn, send_lock, self.stats() | {"id": request["id"]})
+            elif request["type"] == "chat":
+                request["received"] = time.perf_counter()
+                with self.stats_lock:
+                    self.queued += 1
+                asyncio.run_coroutine_threadsafe(self.handle_chat(conn, send_lock, request), self.loop)
+
+        try:
+            conn.close()
+        except:
+            pass
+
+    async def handle_chat(self, conn: Connection, send_lock: Lock, request: dict):
+        model = request["model"]
+
+        async with self.semaphore:
+            with self.stats_lock:
+                self.queued -= 1
+                self.in_flight += 1
+
+            try:
+                # streamed, so the time to first token can be reported back
+                ttft = None
+                content = []
+                thinking = []
+                async for chunk in await self.client.chat(model, stream=True, **request["kwargs"]):
+                    if ttft == None and (chunk.message.content or chunk.message.thinking):
+                        ttft = time.perf_counter() - request["received"]
+                    content.append(chunk.message.content or "")
+                    thinking.append(chunk.message.thinking or "")
+                    response = chunk
+
+                response.message.content = "".join(content)
+                response.message.thinking = "".join(thinking) or None
+                reply = {"response": response.model_dump(), "ttft": ttft}
+
+                with self.stats_lock:
+                    stats = self.models[model]
+                    stats["requests"] += 1
+                    stats["tokens_in"] += response.prompt_eval_count or 0
+                    stats["tokens_out"] += response.eval_count or 0
+                    stats["eval_in"] += (response.prompt_eval_duration or 0) / 1_000_000_000
+                    stats["eval_out"] += (response.eval_duration or 0) / 1_000_000_000
+            except Exception as e:
+                traceback.print_exception(e)
+                reply = {"error": f"{e}"}
+                with self.stats_lock:
+                    self.models[model]["errors"] += 1
+            finally:
+                with self.stats_lock:
+                    self.in_flight -= 1
+
+        reply["id"] = request["id"]
+        self.reply(conn, send_lock, reply)
+
+    def reply(self, conn: Connection, send_lock: Lock, reply: dict):
+        try:
+            with send_lock:
+                conn.send(reply)
+        except (EOFError, OSError):
+            pass
+
+    def stats(self) -> dict:
+        """
+        Returns the queue depth, in-flight count, and per-model throughput.
+        """
+        with self.stats_lock:
+            models = {}
+            for model, stats in self.models.items():
+                models[model] = dict(stats)
+                eval_out = stats["eval_out"]
+                models[model]["tokens_per_second"] = stats["tokens_out"] / eval_out if eval_out else 0
+
+            return {"queued": self.queued, "in_flight": self.in_flight, "models": models}
+
+
+class BrokerClient():
+    """
+    A blocking handle on an InferenceBroker. Connects lazily, so it can be created
+    before an Actor process forks.
+
+    Args:
+        address (tuple): the broker's listener address
+        timeout (float): seconds to wait for a reply before giving up - OPTIONAL
+    """
+    def __init__(self, address, timeout = None):
+        self.address = address
+        self.timeout = timeout
+        self.conn = None
+        self.lock = Lock()
+        self.last_ttft = None
+        self.request_id = 0
+
+    def request(self, message: dict) -> dict:
+        """
+        Sends a request and waits for its reply. Replies to earlier, abandoned
+        requests are discarded.
+        """
+        with self.lock:
+            if self.conn == None:
+                self.conn = Client(self.address)
+
+            self.request_id += 1
+            message["id"] = self.request_id
+            self.conn.send(message)
+
+            if self.timeout == None:
+                deadline = None
+            else:
+                deadline = time.time() + self.timeout
+
+            while True:
+                if deadline != None and not self.conn.poll(max(0, deadline - time.time())):
+                    raise TimeoutError(f"No reply from the broker after {self.timeout}s")
+
+                reply = self.conn.recv()
+                if reply.get("id") == self.request_id:
+                    return reply
+
+    def chat(self, model: str, **kwargs) -> ChatResponse:
+        """
+        Same signature as ollama.chat, but queued through the broker. The broker
+        always streams, and the time to first token (including the time spent
+        queued) is kept in last_ttft.
+        """
+        reply = self.request({"type": "chat", "model": model, "kwargs": kwargs})
+
+        if "error" in reply:
+            raise RuntimeError(f"Broker request failed: {reply['error']}")
+
+        self.last_ttft = reply["ttft"]
+
+        return ChatResponse.model_validate(reply["response"])
+
+    def stats(self) -> dict:
+        return self.request({"type": "stats"})
+
+    def close(self):
+        with self.lock:
+            if self.conn != None:
+                self.conn.close()
+                self.conn = None
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock
+
+DEFAULT_CACHE_PATH = "logs/llm_cache.sqlite"
+
+def request_key(model: str, messages, schema: dict | None, seed, think = False) -> str:
+    """
+    Returns a stable hash of everything that determines an LLM's response.
+    """
+    request = {
+        "model": model,
+        "messages": messages,
+        "schema": schema,
+        "seed": seed,
+        "think": think
+    }
+    encoded = json.dumps(request, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+class ResponseCache():
+    """
+    A content-addressed cache of LLM responses: an in-memory LRU in front of
+    a SQLite store on disk.
+
+    The database is opened lazily, so the cache can be created before an Actor
+    process forks.
+
+    Args:
+        path (str): location of the SQLite file
+        memory_size (int): number of responses kept in memory
+        max_entries (int): number of responses kept on disk, least recently used are evicted first
+    """
+
+    MEMORY_SIZE = 256
+    MAX_ENTRIES = 100_000
+
+    def __init__(self, path = DEFAULT_CACHE_PATH, memory_size = MEMORY_SIZE, max_entries = MAX_ENTRIES):
+        self.path = path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+
+        self.memory = OrderedDict()
+        self.lock = Lock()
+        self.db = None
+
+    def open(self):
+        if self.db == None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, last_used REAL)")
+            self.db.commit()
+        return self.db
+
+    def remember(self, key: str, response):
+        self.memory[key] = response
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def get(self, key: str):
+        """
+        Returns the cached response for key, or None.
+        """
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key]
+
+            db = self.open()
+            row = db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row == None:
+                return None
+
+            db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            db.commit()
+
+            response = json.loads(row[0])
+            self.remember(key, response)
+            return response
+
+    def put(self, key: str, response):
+        """
+        Stores a JSON-serializable response, evicting the least recently used on overflow.
+        """
+        with self.lock:
+            self.remember(key, response)
+
+            db = self.open()
+            db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, json.dumps(response), time.time()))
+
+            overflow = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                db.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)", (overflow,))
+
+            db.commit()
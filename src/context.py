@@ -1,18 +1,83 @@
+import json
+import math
+import re
 from abc import ABC, abstractmethod
+from collections import deque, Counter, defaultdict
+from collections.abc import Sequence
+from itertools import islice
+from threading import Lock
+from typing import Callable
 from llm import LLM
 from logging import Logger
+from utils import estimate_tokens
 
 from pydantic import BaseModel
 
+def render_message(message: dict) -> str:
+    """
+    Renders a GPTMessage as one line of a plain-text transcript.
+    """
+    content = message["content"]
+
+    if message["role"] == "system":
+        return f"SYSTEM: {content}"
+    elif message["role"] != "assistant":
+        return f"{content}"
+
+    # the actor's own replies are JSON actions
+    try:
+        action = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        return f"You: {content}"
+
+    if not isinstance(action, dict):
+        return f"You: {content}"
+
+    if action.get("action") == "speak":
+        line = f"You said, \"{action.get('content')}\""
+    elif action.get("action") == "vote":
+        line = f"You voted for {action.get('content') or action.get('target')}."
+    else:
+        line = f"You chose to {action.get('action')}: {action.get('content')}"
+
+    if action.get("reason"):
+        line += f" Reason: {action['reason']}"
+
+    return line
+
+class ContextView(Sequence):
+    """
+    A read-only view of a context's messages, for building prompts without copying.
+    """
+    __slots__ = ("_messages",)
+
+    def __init__(self, messages):
+        self._messages = messages
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(islice(self._messages, *index.indices(len(self._messages))))
+        return self._messages[index]
+
 class Context(ABC):
     """
-    Abstract class for an LLM context.
+    Abstract class for an LLM context. Messages are kept in a deque owned by
+    the context, so trimming pops from the front instead of copying.
+
+    A plain-text transcript of the messages is kept alongside them, one
+    rendered line per message, so it only has to be joined when needed.
 
     Args:
         llm (LLM): the LLM to use when summmarizing
         context_limit (int): the point at which the message list gets pruned
         context_keep (int): the number of messages to keep upon pruning
-        context (list[GPTMessage]: for pre-loading history
+        context (list[GPTMessage]: for pre-loading history, copied
         summary (str): for pre-loading long-term memory
         logger (Logger): to log
     """
@@ -24,51 +89,59 @@ class Context(ABC):
                  llm: LLM = None, 
                  context_limit = DEFAULT_LIMIT, 
                  context_keep = DEFAULT_KEEP, 
-                 context: list[dict] = [],
+                 context: list[dict] = None,
                  logger: Logger = None,
                  csv_logger = None):
         self.llm = llm
-        self.context = context
+        self.context = deque(context or ())
+        self.transcript_chunks = deque(render_message(message) for message in self.context)
         self.context_limit = context_limit
         self.context_keep = context_keep
         self.logger = logger
         self.csv_logger = csv_logger
 
     def clear(self):
-        self.context = []
+        self.context.clear()
+        self.transcript_chunks.clear()
 
-    def trim(self):
+    def messages(self) -> list[dict]:
         """
-        Trims the context, keeping context_keep messagess
+        A copy of the messages in the context.
         """
-        start = max(0, len(self.context) - self.context_keep)
-        self.context = self.context[start:]
+        return list(self.context)
 
-    def compress_context(self):
+    def view(self) -> ContextView:
+        """
+        The messages in the context, read-only and uncopied, for building a prompt.
+        """
+        return ContextView(self.context)
 
-        compresed = []
-        current_message = ""
-        for message in self.context:
-            if message["role"] == "user":
-                if current_message != "":
-                    current_message += "\n"
-                current_message += f"{message['content']}"
-            else:
-                if current_message != "":
-                    compresed.append({"role": "user", "content": current_message})
-                    compresed.append(message)
-                current_message = ""
+    def load(self) -> int:
+        """
+        How full the context is, in the unit it's limited by.
+        """
+        return len(self.context)
 
-        if current_message != "":
-            compresed.append({"role":"user","content": current_message})
+    def trim(self):
+        """
+        Trims the context, keeping context_keep messagess
+        """
+        while len(self.context) > self.context_keep:
+            self.context.popleft()
+            self.transcript_chunks.popleft()
 
-        return compresed
+    def transcript(self) -> str:
+        """
+        The context as a plain-text transcript.
+        """
+        return "\n".join(self.transcript_chunks)
 
     def append(self, message: dict):
         """
         Appends a GPTMessage to the context
         """
         self.context.append(message)
+        self.transcript_chunks.append(render_message(message))
         if isinstance(self.logger, Logger):
             self.logger.info(f"Appended message to context: {message}")
 
@@ -86,14 +159,18 @@ class Context(ABC):
 
 class SummaryContext(Context):
     """
-    Context which summarizes on demand, with no limit
+    Context which summarizes on demand, with no limit.
+
+    Summaries are incremental: each one folds the messages appended since the
+    last summary into the previous one. It is safe to summarize on a background
+    thread while messages are still being appended.
     """
     def __init__(self, 
                  name: str,
                  personality: str,
                  goal: str,
                  llm = None,
-                 context=[],
+                 context=None,
                  summary="Your memories are fresh!",
                  logger = None,
                  csv_logger = None):
@@ -102,23 +179,54 @@ class SummaryContext(Context):
         self.personality = personality
         self.goal = goal
         self.summary = summary
+        self.lock = Lock()
+
+    def append(self, message: dict):
+        with self.lock:
+            super().append(message)
+
+    def messages(self) -> list[dict]:
+        with self.lock:
+            return super().messages()
+
+    def view(self) -> tuple[dict]:
+        """
+        A snapshot rather than a live view, since the summary thread may be trimming.
+        """
+        with self.lock:
+            return tuple(self.context)
 
     def summarize(self, summary_message):
         """
-        Summarizes the context using the LLM.
+        Summarizes the context using the LLM. The summary_message should carry the previous summary.
         """
-        if self.context != []:
+        with self.lock:
+            summarized = len(self.context)
+            transcript = self.transcript()
+
+        if summarized > 0:
 
             prompt = [{"role": "system", "content": summary_message},
-                      {"role": "user", "content": f"{self.compress_context()}"}]
+                      {"role": "user", "content": transcript}]
             
-            content, reasoning, tokens_in, tokens_out, eval_in, eval_out = self.llm.prompt(prompt, keep_alive=1800)
+            response = self.llm.prompt(prompt)
+
+            # keep the old summary and the unsummarized context for next time
+            if response == None:
+                self.csv_logger.log(actor=self.name, action="llm_error", model=self.llm.model, strategy="summarize", **self.llm.last_metrics)
+                return
+
+            content, reasoning, tokens_in, tokens_out, eval_in, eval_out = response
             self.summary = content
             if isinstance(self.logger, Logger):
                 self.logger.info(f"Created a summary. Usage: {tokens_in + tokens_out} ({eval_in + eval_out} ms)\n{reasoning}\n{self.summary}")
-            self.csv_logger.log(actor=self.name, action="summarize", content=self.summary, tokens_in=tokens_in, tokens_out=tokens_out, eval_in=eval_in, eval_out=eval_out, prompt=prompt, context_length=len(prompt), strategy="summarize")
+            self.csv_logger.log(actor=self.name, action="summarize", content=self.summary, tokens_in=tokens_in, tokens_out=tokens_out, eval_in=eval_in, eval_out=eval_out, prompt=prompt, context_length=len(prompt), strategy="summarize", **self.llm.last_metrics)
 
-            self.context = []
+            # anything that arrived while summarizing waits for the next summary
+            with self.lock:
+                for _ in range(summarized):
+                    self.context.popleft()
+                    self.transcript_chunks.popleft()
 
     def on_limit_reached(self):
         """
@@ -129,11 +237,186 @@ class SummaryContext(Context):
         #self.trim()
 
 class WindowContext(Context):
+    """
+    Sliding window context, backed by a ring buffer of context_limit messages.
+    """
 
     DEFAULT_LIMIT = 50
 
-    def __init__(self, context_limit=DEFAULT_LIMIT, context = [], logger= None):
+    def __init__(self, context_limit=DEFAULT_LIMIT, context = None, logger= None):
         super().__init__(context_limit=context_limit, context_keep=context_limit-1, context=context, logger=logger)
+        self.context = deque(self.context, maxlen=context_limit)
+        self.transcript_chunks = deque(self.transcript_chunks, maxlen=context_limit)
 
     def on_limit_reached(self):
-        self.trim()
\ No newline at end of file
+        self.trim()
+
+class TokenWindowContext(Context):
+    """
+    Sliding window context, limited by tokens rather than by messages.
+
+    Each message is counted once when appended, and a running total is kept,
+    so trimming only ever pops from the front.
+
+    Args:
+        context_limit (int): the number of tokens to keep
+        tokenizer (Callable[[str], int]): counts a string's tokens, defaults to a cheap estimate
+        logger (Logger): to log
+    """
+
+    DEFAULT_LIMIT = 2048
+
+    def __init__(self, context_limit=DEFAULT_LIMIT, tokenizer: Callable[[str], int] = None, logger = None):
+        super().__init__(context_limit=context_limit, logger=logger)
+
+        if tokenizer == None:
+            self.tokenizer = estimate_tokens
+        else:
+            self.tokenizer = tokenizer
+
+        self.token_counts = deque()
+        self.tokens = 0
+
+    def clear(self):
+        self.context.clear()
+        self.transcript_chunks.clear()
+        self.token_counts.clear()
+        self.tokens = 0
+
+    def load(self) -> int:
+        return self.tokens
+
+    def append(self, message: dict):
+        """
+        Appends a GPTMessage to the context, dropping the oldest messages if over the token limit.
+        """
+        count = self.tokenizer(message["content"])
+
+        self.context.append(message)
+        self.transcript_chunks.append(render_message(message))
+        self.token_counts.append(count)
+        self.tokens += count
+
+        if isinstance(self.logger, Logger):
+            self.logger.info(f"Appended message to context: {message}")
+
+        if self.tokens > self.context_limit:
+            if isinstance(self.logger, Logger):
+                self.logger.info(f"Reached context window size {self.tokens}/{self.context_limit} tokens")
+            self.on_limit_reached()
+
+    def trim(self):
+        """
+        Drops the oldest messages until the context fits, always keeping the newest.
+        """
+        while self.tokens > self.context_limit and len(self.context) > 1:
+            self.context.popleft()
+            self.transcript_chunks.popleft()
+            self.tokens -= self.token_counts.popleft()
+
+    def on_limit_reached(self):
+        self.trim()
+
+class RetrievalContext(Context):
+    """
+    Context which keeps every message in a local BM25 index. Prompts get the
+    most recent messages, plus the older ones most relevant to a query.
+
+    Args:
+        recent (int): the number of most recent messages always in the prompt
+        top_k (int): the number of older messages retrieved per query
+        logger (Logger): to log
+    """
+
+    DEFAULT_RECENT = 10
+    DEFAULT_TOP_K = 8
+
+    # BM25 parameters
+    K1 = 1.5
+    B = 0.75
+
+    STOPWORDS = {"a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "has", "have", "he", "her", "his",
+                 "i", "in", "is", "it", "me", "my", "of", "on", "or", "she", "so", "that", "the", "their", "them",
+                 "they", "this", "to", "was", "we", "were", "with", "you", "your", "says"}
+
+    def __init__(self, recent = DEFAULT_RECENT, top_k = DEFAULT_TOP_K, logger = None):
+        super().__init__(context_limit=math.inf, logger=logger)
+        self.recent = deque(maxlen=recent)
+        self.top_k = top_k
+
+        # transcript lines, by document id
+        self.documents = []
+        self.lengths = []
+        self.total_length = 0
+        self.postings = defaultdict(list)   # term -> [(document id, term frequency)]
+
+    @classmethod
+    def terms(cls, text: str) -> list[str]:
+        return [term for term in re.findall(r"\w+", text.lower()) if term not in cls.STOPWORDS]
+
+    def clear(self):
+        super().clear()
+        self.recent.clear()
+        self.documents = []
+        self.lengths = []
+        self.total_length = 0
+        self.postings = defaultdict(list)
+
+    def append(self, message: dict):
+        """
+        Appends a GPTMessage to the context, and indexes it.
+        """
+        super().append(message)
+        self.recent.append(message)
+
+        line = self.transcript_chunks[-1]
+        terms = self.terms(line)
+        document = len(self.documents)
+
+        self.documents.append(line)
+        self.lengths.append(len(terms))
+        self.total_length += len(terms)
+
+        for term, frequency in Counter(terms).items():
+            self.postings[term].append((document, frequency))
+
+    def view(self) -> ContextView:
+        """
+        Only the most recent messages; older ones come from retrieve().
+        """
+        return ContextView(self.recent)
+
+    def retrieve(self, query: str, k: int = None) -> list[str]:
+        """
+        Returns the transcript lines of the k older messages most relevant to the query, oldest first.
+        """
+        if k == None:
+            k = self.top_k
+
+        # the recent messages are already in the prompt
+        searchable = len(self.documents) - len(self.recent)
+        if searchable <= 0:
+            return []
+
+        count = len(self.documents)
+        average_length = self.total_length / count or 1
+        scores = defaultdict(float)
+
+        for term in set(self.terms(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+
+            for document, frequency in postings:
+                if document >= searchable:
+                    break
+                length = self.lengths[document]
+                scores[document] += idf * frequency * (self.K1 + 1) / (frequency + self.K1 * (1 - self.B + self.B * length / average_length))
+
+        best = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [self.documents[document] for document in sorted(best)]
+
+    def on_limit_reached(self):
+        pass
@@ -0,0 +1,132 @@
+from multiprocessing import Process
+from multiprocessing.connection import Listener, Connection, deliver_challenge, answer_challenge, AuthenticationError
+from threading import Thread, Lock, Condition
+from world import World
+
+class GameHost(Process):
+    """
+    Runs many games behind one listener. Each Actor names its game when it
+    connects, and is routed to that game's World, which is created on first
+    contact. Every World keeps its own rooms, voters and logs.
+
+    Games run on threads, and share the process' random module, so they are not
+    reproducible from their seed.
+
+    Args:
+        listener (Listener): where every game's Actors connect
+        new_game (Callable[[str], World]): builds the World for a game id, with listen=False
+        game_ids (Iterable[str]): the games this host plays; Actors naming any other game are turned away
+        authkey (bytes): the key Actors must connect with, checked off the accept thread, so the
+            listener itself should have none - OPTIONAL
+        max_games (int): games played at once; Actors for any more wait until a game ends - OPTIONAL
+        total_games (int): the host stops once this many games have ended - OPTIONAL
+    """
+
+    MAX_GAMES = 4
+    HELLO_TIMEOUT = 10 # seconds a new connection has to send its info
+
+    def __init__(self, listener: Listener, new_game, game_ids, authkey: bytes = None, max_games = MAX_GAMES, total_games: int = None):
+        super().__init__()
+        self.listener = listener
+        self.server_authkey = authkey  # not self.authkey, which is the Process' own key
+        self.new_game = new_game
+        self.game_ids = set(game_ids)
+        self.max_games = max_games
+        self.total_games = total_games
+
+        self.lock = Lock()
+        self.games = {}             # game id -> World, for games in progress
+        self.waiting = {}           # game id -> [(conn, actor info)], for games over the cap
+        self.finished = set()       # game ids that have ended
+        self.game_over = Condition(self.lock)
+
+    def run(self):
+        Thread(target=self.connection_loop, daemon=True).start()
+
+        with self.game_over:
+            self.game_over.wait_for(lambda: self.total_games != None and len(self.finished) >= self.total_games)
+
+        self.listener.close()
+
+    def connection_loop(self):
+        """
+        Accepts new Actors, and hands each to its own thread to be authenticated and
+        routed, so a slow or silent client can't hold up anyone else's connection.
+        """
+        while True:
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError):
+                break
+
+            Thread(target=self.greet, args=(conn,), daemon=True).start()
+
+    def greet(self, conn: Connection):
+        """
+        Authenticates a new Actor and routes it to its game. The first message from
+        the actor must be its info.
+        """
+        try:
+            if self.server_authkey:
+                deliver_challenge(conn, self.server_authkey)
+                answer_challenge(conn, self.server_authkey)
+
+            if not conn.poll(self.HELLO_TIMEOUT):
+                conn.close()
+                return
+            actor = conn.recv()
+        except (OSError, EOFError, AuthenticationError):
+            conn.close()
+            return
+
+        self.route(conn, actor)
+
+    def route(self, conn: Connection, actor: dict):
+        game = actor.get("game") if isinstance(actor, dict) else None
+
+        with self.lock:
+            if game not in self.game_ids or game in self.finished:
+                conn.close()
+                return
+            elif game in self.games:
+                world = self.games[game]
+            elif len(self.games) < self.max_games:
+                world = self.start_game(game)
+            else:
+                self.waiting.setdefault(game, []).append((conn, actor))
+                return
+
+        world.accept_actor(conn, actor)
+
+    # NOTE: this is NOT THREAD SAFE, and is intended to be called already within self.lock
+    def start_game(self, game: str) -> World:
+        world = self.new_game(game)
+        self.games[game] = world
+        Thread(target=self.play, args=(game, world), daemon=True).start()
+        return world
+
+    def play(self, game: str, world: World):
+        world.run()
+
+        # the world is done with its actors, so hang up on them
+        for actor in list(world.actors.values()):
+            try:
+                actor["conn"].close()
+            except OSError:
+                pass
+
+        with self.lock:
+            self.games.pop(game, None)
+            self.finished.add(game)
+            self.game_over.notify_all()
+
+            # the next game in line takes the free slot
+            if self.waiting:
+                next_game = next(iter(self.waiting))
+                queued = self.waiting.pop(next_game)
+                next_world = self.start_game(next_game)
+            else:
+                queued = []
+
+        for conn, actor in queued:
+            next_world.accept_actor(conn, actor)
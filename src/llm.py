@@ -1,12 +1,21 @@
 import json
-from ollama import chat
+import os
+import random
+import time
+from functools import lru_cache
+from typing import Literal
+from logging import Logger
 from openai import OpenAI
 from pydantic import BaseModel
+from backends import Backend, OllamaBackend, OpenAIBackend, ReplayExhausted
+from cache import ResponseCache, request_key
+from utils import estimate_tokens
+from residency import KEEP_ALIVE
 
 API_PATH = "config/api.json"
 
 class BasicActionMessage(BaseModel):
-    action: str
+    action: Literal["speak", "vote", "pass"]
     content: str
     reason: str | None
 
@@ -16,12 +25,30 @@ class AdvancedActionMessage(BaseModel):
     target: str | None
     reason: str | None
 
+@lru_cache(maxsize=None)
+def action_schema(enforce_model: type[BaseModel]) -> dict:
+    """
+    Returns an action model's JSON schema, built once per model rather than every request.
+    """
+    return enforce_model.model_json_schema()
+
 # TODO: graceful exit on bad api.json file
 class LLM:
     """
-    An interface for an LLM. Can be local or openai.
+    An interface for an LLM. Can be local or openai, or any other Backend.
+
+    Local requests go through an InferenceBroker when given its address.
+    Responses are looked up in, and stored to, a ResponseCache when given one.
+
+    Failed or timed out requests are retried with jittered exponential backoff.
+    Failures are reported to the logger when given one, rather than the console.
     """
-    def __init__(self, cloud = False, model = "dolphin3:8b", seed=1234):
+
+    TIMEOUT = 120       # seconds per request
+    RETRIES = 2         # extra attempts after the first
+    BACKOFF = 1         # seconds before the first retry, doubled after each
+
+    def __init__(self, cloud = False, model = "dolphin3:8b", seed=1234, broker = None, cache: ResponseCache = None, backend: Backend = None, timeout = TIMEOUT, retries = RETRIES, logger: Logger = None):
 
         self.cloud = cloud
 
@@ -31,83 +58,166 @@ class LLM:
             json_file.close()
 
             self.client = OpenAI(
-                api_key=api["key"]
+                api_key=api["key"],
+                timeout=timeout,
+                max_retries=0
             )
             self.model = api["model"]
         else:
             self.model = model
 
         self.seed=seed
+        self.logger = logger
+        self.timeout = timeout
+        self.retries = retries
+
+        # separate from the global random, so retries don't change the game
+        self.jitter = random.Random(seed)
+
+        if backend != None:
+            self.backend = backend
+        elif cloud:
+            self.backend = OpenAIBackend(self.client)
+        else:
+            self.backend = OllamaBackend(broker, timeout)
+
+        self.broker = getattr(self.backend, "broker", None)
+
+        self.cache = cache
+        self.cache_hits = 0
+        self.cache_misses = 0
 
+        # per-call bookkeeping, for the csv logs
+        self.last_metrics = {}
+        self.last_prompt = ""
+
+    def warn(self, message: str):
+        """
+        Reports a failure to the logger, or the console if there isn't one.
+        """
+        if isinstance(self.logger, Logger):
+            self.logger.warning(message)
+        else:
+            print(message)
 
+    def chat_with_retries(self, message, enforce_model, schema, think, keep_alive) -> dict:
+        """
+        Sends a request to the backend, retrying on failure. Raises the last error.
+        """
+        attempt = 0
+
+        while True:
+            try:
+                response = self.backend.chat(self.model,
+                                             message,
+                                             enforce_model=enforce_model,
+                                             schema=schema,
+                                             think=think,
+                                             keep_alive=keep_alive,
+                                             seed=self.seed)
+                self.last_metrics["retries"] = attempt
+                return response
+            except ReplayExhausted:
+                # asking again won't record any more responses
+                raise
+            except Exception as e:
+                if attempt >= self.retries:
+                    self.last_metrics["retries"] = attempt
+                    raise
+
+                delay = self.BACKOFF * 2 ** attempt * self.jitter.uniform(0.5, 1.5)
+                self.warn(f"{self.model} request failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    def prefill(self, message: list[dict], keep_alive = KEEP_ALIVE) -> tuple[int, float] | None:
+        """
+        Sends a prompt only so the server processes it into its KV cache, ahead of
+        a real request that starts with the same messages.
+
+        Returns:
+            tuple[int, float]: tokens processed and seconds spent processing them,
+                None if the backend can't prefill or the request failed
+        """
+        if not self.backend.SUPPORTS_PREFILL:
+            return None
+
+        try:
+            response = self.backend.chat(self.model, message, keep_alive=keep_alive, seed=self.seed, max_tokens=1)
+        except Exception as e:
+            self.warn(f"{self.model} prefill failed: {e}")
+            return None
+
+        self.last_prompt = json.dumps(message, ensure_ascii=False)
+
+        return response["tokens_in"], response["eval_in"]
 
     # TODO: not dict, but Response return
-    def prompt(self, message: str | dict | list[dict], enforce_model = None, think = True, keep_alive = 0) -> dict:
+    def prompt(self, message: str | dict | list[dict], enforce_model = None, think = True, keep_alive = KEEP_ALIVE) -> dict:
         """
         Prompts the LLM.
 
         Args:
             message (GPTMessage | list[GPTMessage]): context/message to send to LLM
             json (bool): forces JSON output, default False
+
+        Raises:
+            ReplayExhausted: a replayed actor has run out of recorded responses
         """
+        reasoning = None
+
         if think and self.model not in ["deepseek-r1:8b", "deepseek-r1:14b", "qwen3:8b", "qwen3:13b", "magistral"]:
             think = False
-            reasoning = False
+
+        if enforce_model:
+            schema = action_schema(enforce_model)
+        else:
+            schema = None
+
+        self.last_metrics = {}
+
+        if self.cache:
+            key = request_key(self.model, message, schema, self.seed, think)
+            cached = self.cache.get(key)
+
+            if cached != None:
+                self.cache_hits += 1
+                self.last_metrics.update({"cache": "hit", "cache_hits": self.cache_hits, "cache_misses": self.cache_misses})
+                content, reasoning, tokens_in, tokens_out = cached
+                return content, reasoning, tokens_in, tokens_out, 0, 0
+
+            self.cache_misses += 1
+            self.last_metrics.update({"cache": "miss", "cache_hits": self.cache_hits, "cache_misses": self.cache_misses})
 
         try:
-            if self.cloud:
-                if enforce_model:
-                    response = self.client.chat.completions.parse(
-                        model = self.model,
-                        messages=message,
-                        response_format=enforce_model
-                    )
-                else:
-                    response = self.client.chat.completions.create(
-                        model = self.model,
-                        messages=message
-                    )
-                content = response.choices[0].message.content
-                
-                usage = response.usage
-
-                # TODO: rework this
-                tokens_in = 0
-                tokens_out = 0
-                eval_in = 0
-                eval_out = 0
-
-
-            else:
-                if enforce_model:
-                    response = chat(self.model, 
-                                    messages=message, 
-                                    think=False, 
-                                    format=enforce_model.model_json_schema(), 
-                                    keep_alive=keep_alive,
-                                    options={"seed": self.seed})
-                else:
-                    response = chat(self.model, 
-                                    messages=message, 
-                                    think=False, 
-                                    keep_alive=keep_alive,
-                                    options={"seed": self.seed})
-
-                content = response.message.content
-
-                if think:
-                    reasoning = response.message.thinking
-                tokens_in = response.prompt_eval_count
-                tokens_out = response.eval_count
-                eval_in = response.prompt_eval_duration / 1_000_000_000
-                eval_out = response.eval_duration / 1_000_000_000
-
-                #print(message)
-                #print(response)
+            response = self.chat_with_retries(message, enforce_model, schema, think, keep_alive)
+
+            content = response["content"]
+
+            if think:
+                reasoning = response["reasoning"]
+            tokens_in = response["tokens_in"]
+            tokens_out = response["tokens_out"]
+            eval_in = response["eval_in"]
+            eval_out = response["eval_out"]
+
+            # cached_tokens is only ever what the server reports (ollama doesn't). The estimate is
+            # the prefix shared with this LLM's previous request, prefills included: what the
+            # server could have reused, if nothing else evicted it, not what it did reuse
+            prompt_text = json.dumps(message, ensure_ascii=False)
+            cached_tokens = response.get("cached_tokens", "")
+            shared_prefix_tokens_est = estimate_tokens(os.path.commonprefix([self.last_prompt, prompt_text]))
+            self.last_prompt = prompt_text
+            self.last_metrics.update({"prefill_tokens": tokens_in, "cached_tokens": cached_tokens, "shared_prefix_tokens_est": shared_prefix_tokens_est, "ttft": response["ttft"], "total_time": response["total_time"], "load_time": response.get("load_time", 0)})
+
+            if self.cache:
+                self.cache.put(key, [content, reasoning, tokens_in, tokens_out])
 
             return content, reasoning, tokens_in, tokens_out, eval_in, eval_out
+        except ReplayExhausted:
+            raise
         except Exception as e:
-            print(f"{e}\nmessage = {message}")
+            self.warn(f"{e}\nmessage = {message}")
 
         return None
 
@@ -1,14 +1,18 @@
 from actor import Actor, DEFAULT_ADDRESS
-from context import SummaryContext, WindowContext
+from context import SummaryContext, WindowContext, TokenWindowContext, RetrievalContext
 from llm import LLM, BasicActionMessage, AdvancedActionMessage
+from cache import ResponseCache
+from backends import ReplayBackend, ReplayExhausted
 from abc import ABC, abstractmethod
 import time
 import random
-import json
+from threading import Thread, Lock
+from multiprocessing.connection import wait
 from utils import create_logger
 from datetime import datetime
 from room import Room
 from logging import Logger
+from pydantic import ValidationError
 
 GAME_MODEL = "llama3.1:8b"
 
@@ -22,6 +26,15 @@ class NPC(Actor, ABC):
     WAIT_MIN = 3
     WAIT_MAX = 8
 
+    POLL_TIMEOUT = 1 # seconds a turn-based NPC blocks on its connection before checking again
+
+    SUMMARY_TIMEOUT = 600 # the summary model is big and slow
+
+    # which prompt sections each world message invalidates, and which sections
+    # are built from other sections. Filled in by subclasses.
+    SECTION_INPUTS = {}
+    SECTION_PARTS = {}
+
     def __init__(self, 
                  name, 
                  personality, 
@@ -36,11 +49,32 @@ class NPC(Actor, ABC):
                  csv_logger=None, 
                  strategy="window",
                  seed=1234,
-                 address=DEFAULT_ADDRESS):
-        super().__init__(name, personality, goal, description, can_speak=can_speak, gender=gender, address=address)
+                 address=DEFAULT_ADDRESS,
+                 broker=None,
+                 cache_path=None,
+                 replay=None,
+                 replay_latency="zero",
+                 prompt_layout="classic",
+                 pacing=False,
+                 game=None,
+                 authkey=None):
+        super().__init__(name, personality, goal, description, can_speak=can_speak, gender=gender, address=address, game=game, authkey=authkey)
+
+        if cache_path:
+            cache = ResponseCache(cache_path)
+        else:
+            cache = None
+
+        # replays a logged game's responses instead of calling a model server
+        if replay:
+            game_backend = ReplayBackend(replay, name, "prompt", replay_latency)
+            summary_backend = ReplayBackend(replay, name, "summarize", replay_latency)
+        else:
+            game_backend = None
+            summary_backend = None
         
-        self.llm = LLM(False, game_model, seed)
-        self.summary_llm = LLM(False, summary_model, seed)
+        self.llm = LLM(False, game_model, seed, broker=broker, cache=cache, backend=game_backend, logger=logger)
+        self.summary_llm = LLM(False, summary_model, seed, broker=broker, cache=cache, backend=summary_backend, timeout=self.SUMMARY_TIMEOUT, logger=logger)
         self.seed = seed
 
         self.vote_state = None
@@ -62,14 +96,41 @@ class NPC(Actor, ABC):
         
         self.turn_based = turn_based
 
+        # real-time only: sleep a random WAIT_MIN-WAIT_MAX seconds between polls,
+        # so NPCs don't all talk at once. Turn-based NPCs always react immediately.
+        self.pacing = pacing and not turn_based
+
+        # "classic" puts the whole character sheet up front, "prefix" keeps the
+        # front of the prompt static so the server can reuse its KV cache
+        self.prompt_layout = prompt_layout
+
         if turn_based:
             self.action_model = BasicActionMessage
         else:
             self.action_model = AdvancedActionMessage
 
         self.has_turn = False
+        self.turn = None
+        self.inference_time = 0     # seconds the last action spent in the LLM
+        self.prefill_saved = 0
+
+        # summaries run in the background, while other players take their turns
+        self.summary_thread = None
+        self.send_lock = Lock()
         self.vote_targets = []
 
+        # prompt sections are cached, and only rebuilt when their inputs change
+        self.sections = {}
+        self.dirty_sections = set()
+        self.sections_rebuilt = 0   # for the latest act prompt only
+        self.sections_reused = 0
+
+        self.parse_failures = 0     # replies that didn't validate as an action
+
+        # replica of the room state, kept up to date by numbered deltas from the world
+        self.room_seq = None
+        self.awaiting_snapshot = False
+
         # REALTIME THINGS
         self.is_awake = False   # start npcs asleep
         self.new_messages = False # used in real-time processing
@@ -79,7 +140,7 @@ class NPC(Actor, ABC):
 
         if self.strategy == "summary":
             if self.context != None:
-                memory = self.context.context
+                memory = self.context.messages()
                 last_summary = self.context.summary
             else:
                 memory = []
@@ -93,6 +154,10 @@ class NPC(Actor, ABC):
                                           csv_logger=self.csv_logger, 
                                           context=memory, 
                                           summary=last_summary)
+        elif self.strategy == "token_window":
+            self.context = TokenWindowContext()
+        elif self.strategy == "retrieval":
+            self.context = RetrievalContext(logger=self.logger)
         else:
             self.context = WindowContext()
 
@@ -107,6 +172,88 @@ class NPC(Actor, ABC):
     def summarize(self):
         if self.strategy == "summary":
             self.context.summarize(self.generate_summary_message())
+
+    def start_summary(self):
+        """
+        Starts summarizing on a background thread, which tells the world when it's ready.
+        """
+        self.finish_summary()
+
+        # built now, from the current state, rather than whenever the thread gets to it
+        if self.strategy == "summary":
+            summary_message = self.generate_summary_message()
+        else:
+            summary_message = None
+
+        self.summary_thread = Thread(target=self.background_summary, args=(summary_message,), daemon=True)
+        self.summary_thread.start()
+
+    def background_summary(self, summary_message: str | None):
+        if summary_message:
+            try:
+                self.context.summarize(summary_message)
+            except ReplayExhausted as e:
+                self.replay_exhausted(e)
+                return
+        self.send({"action": "ready"})
+
+    def replay_exhausted(self, error: Exception):
+        """
+        Tells the world this NPC's replay log has run out, so it can end the game
+        rather than play on with made-up actions.
+        """
+        if isinstance(self.logger, Logger):
+            self.logger.error(f"{self.name}: {error}")
+        self.csv_logger.log(actor=self.name, action="replay_exhausted", content=str(error), role=self.role, phase=self.phase)
+        self.send_action({"action": "replay_exhausted", "reason": str(error)})
+
+    def finish_summary(self):
+        """
+        Waits for a background summary, if there is one.
+        """
+        if self.summary_thread != None:
+            self.summary_thread.join()
+            self.summary_thread = None
+            self.mark_dirty("summary")
+
+    def mark_dirty(self, input: str):
+        """
+        Marks the prompt sections built from an input as stale, along with
+        every section built from those.
+
+        Args:
+            input (str): the world message type (or "summary") that changed
+        """
+        self.dirty_sections.update(self.SECTION_INPUTS.get(input, ()))
+
+        # SECTION_PARTS lists composite sections after the sections they're made of
+        for section, parts in self.SECTION_PARTS.items():
+            if not self.dirty_sections.isdisjoint(parts):
+                self.dirty_sections.add(section)
+
+    def section(self, name: str, build) -> str:
+        """
+        Returns a cached prompt section, rebuilding it first if it's stale.
+
+        Args:
+            name (str): the section's name
+            build (Callable): builds the section's text
+        """
+        if name in self.dirty_sections or name not in self.sections:
+            self.sections[name] = build()
+            self.dirty_sections.discard(name)
+            self.sections_rebuilt += 1
+        else:
+            self.sections_reused += 1
+
+        return self.sections[name]
+
+    def send(self, message: dict):
+        """
+        Sends to the world. Safe to call from the summary thread.
+        """
+        with self.send_lock:
+            self.conn.send(message)
     
     @abstractmethod
     def gen_system_prompt(self):
@@ -114,52 +261,215 @@ class NPC(Actor, ABC):
         if self.strategy == "summary":
             prompt = [
                 {"role": "system", "content": self.SYSTEM_MESSAGE + "\n" + self.character_sheet() + "\nCurrent Summary:\n" + self.context.summary}
-            ] + self.context.context
+            ]
         else:
             prompt = [
                 {"role": "system", "content": self.SYSTEM_MESSAGE + "\n" + self.character_sheet() + "\nGeneral Strategy:\n"}
-            ] + self.context.context
+            ]
+
+        prompt.extend(self.context.view())
 
         return prompt
 
+    def gen_prompt_prefix(self):
+        """
+        The part of the next prompt that is already known before the turn starts.
+        """
+        return self.gen_system_prompt()[:-1]
+
+    def prefill(self):
+        """
+        Warms the server's KV cache with the prompt prefix while someone else has the turn.
+        """
+        result = self.llm.prefill(self.gen_prompt_prefix())
+
+        if result:
+            tokens_in, eval_in = result
+            # this much prompt processing is off the critical path of the next turn
+            self.prefill_saved = eval_in
+            self.csv_logger.log(actor=self.name, action="prefill", tokens_in=tokens_in, eval_in=eval_in, model=self.llm.model, strategy=self.strategy, role=self.role, phase=self.phase)
+
     def act(self):
 
+        # the world shouldn't hand out a turn mid-summary, but never act on a stale summary
+        self.finish_summary()
+
+        # count section reuse for this prompt only, not for prefills or summaries built since the last turn
+        self.sections_rebuilt = 0
+        self.sections_reused = 0
+
         prompt = self.gen_system_prompt()
 
         if isinstance(self.logger, Logger):
             self.logger.info(f"{self.name} sending to LLM. Prompt:\n{prompt}")
 
-        content, reasoning, tokens_in, tokens_out, eval_in, eval_out = self.llm.prompt(prompt, enforce_model=self.action_model, keep_alive=1800)
+        try:
+            response = self.llm.prompt(prompt, enforce_model=self.action_model)
+        except ReplayExhausted as e:
+            self.replay_exhausted(e)
+            return
+
+        self.inference_time = self.llm.last_metrics.get("total_time", 0)
+
+        # inference failed even after retries, so give up the turn rather than stall it
+        if response == None:
+            self.csv_logger.log(actor=self.name, action="llm_error", model=self.llm.model, strategy=self.strategy, role=self.role, phase=self.phase, **self.llm.last_metrics)
+            self.send_action({"action": "pass", "content": "...", "reason": "Inference failed."})
+            return
+
+        content, reasoning, tokens_in, tokens_out, eval_in, eval_out = response
         
         if isinstance(self.logger, Logger):
             self.logger.info(f"{self.name} received response from {self.llm.model}. Tokens in: {tokens_in} ({eval_in} ms), tokens out: {tokens_out} ({eval_out} ms)\n{reasoning}\n{content}")
         
         output_str = content
 
+        self.csv_logger.log(actor=self.name, action="prompt", content=output_str, tokens_in=tokens_in, tokens_out=tokens_out, eval_in=eval_in, eval_out=eval_out, model=self.llm.model, prompt=prompt, context_length=self.context.load(), strategy=self.strategy, role=self.role, phase=self.phase, prefill_saved=self.prefill_saved, sections_rebuilt=self.sections_rebuilt, sections_reused=self.sections_reused, parse_failures=self.parse_failures, **self.llm.last_metrics)
+        self.prefill_saved = 0
+
+        # validated once here, so the world only ever sees well-formed actions
         try:
+            output = self.action_model.model_validate_json(output_str).model_dump(exclude_none=True)
+        except ValidationError as e:
+            self.parse_failures += 1
+            self.csv_logger.log(actor=self.name, action="parse_failure", content=output_str, model=self.llm.model, strategy=self.strategy, role=self.role, phase=self.phase, parse_failures=self.parse_failures)
 
-            output = json.loads(output_str)
+            if isinstance(self.logger, Logger):
+                self.logger.warning(f"{self.name} sent an invalid action: {e}")
 
-            self.csv_logger.log(actor=self.name, action="prompt", content=output_str, tokens_in=tokens_in, tokens_out=tokens_out, eval_in=eval_in, eval_out=eval_out, model=self.llm.model, prompt=prompt, context_length=len(self.context.context), strategy=self.strategy, role=self.role, phase=self.phase)
+            self.context.append({"role": "system", "content": "ERROR: your last reply was not a valid action, so you stayed quiet. You must return valid JSON, with one of the available actions."})
+            self.send_action({"action": "pass", "reason": "Invalid action."})
+            return
 
-            if output_str == self.last_output:
-                self.csv_logger.log(actor=self.name, content="WARNING: suppresesd duplicate message")
-                self.conn.send({"action": "vote", "content": "self"})
-            else:
-                self.last_output = output_str
+        if output_str == self.last_output:
+            self.csv_logger.log(actor=self.name, content="WARNING: suppresesd duplicate message")
+            self.send_action({"action": "vote", "content": "self"})
+        else:
+            self.last_output = output_str
 
-            self.context.append({"role": "assistant", "content": output_str})
+        self.context.append({"role": "assistant", "content": output_str})
 
+        if isinstance(self.logger, Logger):
+            self.logger.info(f"{self.name} sent to world: {output}")
+        self.send_action(output)
+
+    def apply_room_snapshot(self, snapshot: dict):
+        """
+        Replaces the room replica with the world's full copy.
+        """
+        self.room_info = snapshot["room"]
+        self.vote_targets = snapshot["vote_targets"]
+        self.vote_state = snapshot["vote_state"]
+        self.room_seq = snapshot["seq"]
+        self.awaiting_snapshot = False
+
+        for input in ["room", "vote_targets", "vote_state"]:
+            self.mark_dirty(input)
+
+    def apply_room_delta(self, delta: dict):
+        """
+        Applies one change to the room replica. A skipped sequence number means a
+        delta went missing, so the replica asks the world for a snapshot.
+        """
+        if delta["room"] != self.room_info.get("name") or self.awaiting_snapshot:
+            return
+
+        # already part of the last snapshot
+        if self.room_seq != None and delta["seq"] <= self.room_seq:
+            return
+
+        if self.room_seq == None or delta["seq"] != self.room_seq + 1:
             if isinstance(self.logger, Logger):
-                self.logger.info(f"{self.name} sent to world: {output}")
-            self.conn.send(output)
-
-        except Exception as e:
-            self.conn.send({"action": "vote", "content": f"{self.name}", "reason": f"Exception: {e}"})
+                self.logger.warning(f"{self.name} missed a room update ({self.room_seq} -> {delta['seq']}), resyncing.")
+            self.awaiting_snapshot = True
+            self.send({"action": "resync"})
+            return
+
+        self.room_seq = delta["seq"]
+
+        if delta["op"] == "joined":
+            self.room_info["actors"][delta["actor"]["name"]] = delta["actor"]
+            self.mark_dirty("room")
+        elif delta["op"] in ["left", "died"]:
+            self.room_info["actors"].pop(delta["name"], None)
+            self.mark_dirty("room")
+        elif delta["op"] == "votes_reset":
+            self.vote_targets = delta["vote_targets"]
+            self.vote_state = delta["vote_state"]
+            self.mark_dirty("vote_targets")
+            self.mark_dirty("vote_state")
+        elif delta["op"] == "vote":
+            if self.vote_state == None:
+                self.vote_state = {}
+            self.vote_state[delta["voter"]] = delta["target"]
+            self.mark_dirty("vote_state")
+
+    def send_action(self, action: dict):
+        """
+        Sends an action to the world, stamped with the turn and phase it answers,
+        and how long it took to generate.
+        """
+        action["turn"] = self.turn
+        action["phase"] = self.phase
+        action["inference_time"] = self.inference_time
+        self.send(action)
             
     def update_role(self, new_role):
         self.role = new_role
 
+    def wait_for_messages(self):
+        """
+        Blocks until the world sends something, rather than sleeping a fixed time.
+
+        In real-time mode, a quiet period of WAIT_MAX seconds still counts as a round,
+        so NPCs speak up when nobody else does.
+        """
+        if self.pacing:
+            time.sleep(random.randint(self.WAIT_MIN, self.WAIT_MAX))
+        elif self.turn_based:
+            wait([self.conn], timeout=self.POLL_TIMEOUT)
+        else:
+            wait([self.conn], timeout=self.WAIT_MAX)
+
+    def handle_message(self, msg: dict):
+        """
+        Applies one message from the world to the NPC's state.
+        """
+        if msg["type"] == "context":
+            self.context.append(msg["content"])
+            self.new_messages = True
+        elif msg["type"] == "summarize":
+            self.start_summary()
+        elif msg["type"] == "room":
+            self.room_info = msg["content"]
+        elif msg["type"] == "room_snapshot":
+            self.apply_room_snapshot(msg["content"])
+        elif msg["type"] == "room_delta":
+            self.apply_room_delta(msg["content"])
+        elif msg["type"] == "role":
+            self.update_role(msg["content"])
+        elif msg["type"] == "sleep":
+            self.is_awake = False
+        elif msg["type"] == "wake":
+            self.is_awake = True
+        elif msg["type"] == "phase":
+            self.phase = msg["content"]
+        elif msg["type"] == "vote_targets":
+            self.vote_targets = msg["content"]
+        elif msg["type"] == "vote_state":
+            self.vote_state = msg["content"]
+        elif msg["type"] == "act_token":
+            self.has_turn = True
+            self.turn = msg.get("turn")
+        elif msg["type"] == "strategy":
+            self.set_strategy(msg["content"])
+        elif msg["type"] == "team":
+            self.teammates = msg["content"]
+        elif msg["type"] == "prefill":
+            self.prefill()
+
+        self.mark_dirty(msg["type"])
+
     def run(self):
         random.seed(self.seed)
         self.connect()
@@ -176,32 +486,7 @@ class NPC(Actor, ABC):
                     if isinstance(self.logger, Logger):
                         self.logger.info(f"{self.name} received world message: {msg}")
                     
-                    if msg["type"] == "context":
-                        self.context.append(msg["content"])
-                        self.new_messages = True
-                    elif msg["type"] == "summarize":
-                        self.summarize()
-                        self.conn.send({"action": "ready"})
-                    elif msg["type"] == "room":
-                        self.room_info = msg["content"]
-                    elif msg["type"] == "role":
-                        self.update_role(msg["content"])
-                    elif msg["type"] == "sleep":
-                        self.is_awake = False
-                    elif msg["type"] == "wake":
-                        self.is_awake = True
-                    elif msg["type"] == "phase":
-                        self.phase = msg["content"]
-                    elif msg["type"] == "vote_targets":
-                        self.vote_targets = msg["content"]
-                    elif msg["type"] == "vote_state":
-                        self.vote_state = msg["content"]
-                    elif msg["type"] == "act_token":
-                        self.has_turn = True
-                    elif msg["type"] == "strategy":
-                        self.set_strategy(msg["content"])
-                    elif msg["type"] == "team":
-                        self.teammates = msg["content"]
+                    self.handle_message(msg)
 
                 if not self.turn_based and self.is_awake and (quiet_round_passed or self.new_messages):
                     self.act()
@@ -219,7 +504,7 @@ class NPC(Actor, ABC):
             except ConnectionResetError:
                 break
 
-            time.sleep(random.randint(self.WAIT_MIN, self.WAIT_MAX)) 
+            self.wait_for_messages()
 
         try:
             self.conn.close()
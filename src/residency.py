@@ -0,0 +1,77 @@
+import time
+from ollama import Client
+
+KEEP_ALIVE = 1800 # seconds a model stays loaded after its last request
+
+class ModelResidency():
+    """
+    Decides which models ollama keeps loaded, so that swaps happen on purpose
+    and get logged, rather than whenever the server runs out of memory.
+
+    Policies:
+        pinned: both models are loaded at startup and kept loaded
+        swap: only one model is loaded at a time, swapped around the summaries
+
+    Args:
+        game_model (str): the model NPCs act with
+        summary_model (str): the model NPCs summarize with
+        policy (str): "pinned" or "swap"
+        keep_alive (int): seconds a model stays loaded after its last request
+        host (str): the ollama server, defaults to ollama's own default - OPTIONAL
+        log (Callable): called with (action, model, load_time, total_time) for every load/unload, total_time being the whole request - OPTIONAL
+    """
+    def __init__(self, game_model: str, summary_model: str, policy = "pinned", keep_alive = KEEP_ALIVE, host: str = None, log = None):
+        self.game_model = game_model
+        self.summary_model = summary_model
+        self.policy = policy
+        self.keep_alive = keep_alive
+        self.host = host
+        self.log = log
+        self.client = None
+
+    def preload(self, model: str) -> float:
+        """
+        Loads a model with an empty request.
+
+        Returns:
+            float: seconds ollama spent loading it, 0 if it was already loaded
+        """
+        if self.client == None:
+            self.client = Client(self.host)
+
+        start = time.perf_counter()
+        response = self.client.generate(model=model, prompt="", keep_alive=self.keep_alive)
+        load_time = (response.load_duration or 0) / 1_000_000_000
+
+        if self.log:
+            self.log("model_load", model, load_time, time.perf_counter() - start)
+
+        return load_time
+
+    def unload(self, model: str):
+        if self.client == None:
+            self.client = Client(self.host)
+
+        start = time.perf_counter()
+        self.client.generate(model=model, prompt="", keep_alive=0)
+
+        if self.log:
+            self.log("model_unload", model, 0, time.perf_counter() - start)
+
+    def warm_up(self):
+        """
+        Loads the models before the first turn.
+        """
+        if self.policy == "pinned" and self.summary_model != self.game_model:
+            self.preload(self.summary_model)
+        self.preload(self.game_model)
+
+    def before_summaries(self):
+        if self.policy == "swap" and self.summary_model != self.game_model:
+            self.unload(self.game_model)
+            self.preload(self.summary_model)
+
+    def after_summaries(self):
+        if self.policy == "swap" and self.summary_model != self.game_model:
+            self.unload(self.summary_model)
+            self.preload(self.game_model)
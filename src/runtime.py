@@ -0,0 +1,63 @@
+from multiprocessing import Process, Pipe
+from threading import Thread
+from world import World
+from actor import Actor
+
+class ActorRuntime(Process):
+    """
+    Runs Worlds and their Actors as threads inside one process, instead of one
+    process each. Actors talk to their World over Pipes, with the same messages
+    they would send over the network.
+
+    Every Actor shares the process' random module, so games run this way are not
+    reproducible from their seed. Use the process runtime for seeded runs.
+
+    Args:
+        games (list[tuple[World, list[Actor]]]): each World, with the Actors that play in it
+    """
+    def __init__(self, games: list[tuple[World, list[Actor]]]):
+        super().__init__()
+        self.games = games
+
+    def run(self):
+        games = [start_game(world, actors) for world, actors in self.games]
+
+        for world_thread, actor_threads, conns in games:
+            world_thread.join()
+
+            # the world is done with its actors, so hang up on them
+            for conn in conns:
+                try:
+                    conn.close()
+                except OSError:
+                    pass
+
+            for thread in actor_threads:
+                thread.join()
+
+def start_game(world: World, actors: list[Actor]):
+    """
+    Starts a World and its Actors on threads in this process, connected by Pipes.
+
+    Returns:
+        tuple[Thread, list[Thread], list[Connection]]: the world's thread, the actors' threads, and the world's ends of the Pipes
+    """
+    world_thread = Thread(target=world.run, daemon=True)
+    world_thread.start()
+
+    actor_threads = []
+    conns = []
+
+    for actor in actors:
+        world_conn, actor_conn = Pipe()
+        actor.conn = actor_conn
+
+        thread = Thread(target=actor.run, daemon=True)
+        thread.start()
+
+        world.accept_actor(world_conn)
+
+        actor_threads.append(thread)
+        conns.append(world_conn)
+
+    return world_thread, actor_threads, conns
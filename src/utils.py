@@ -3,6 +3,9 @@ from multiprocessing import Lock
 import logging
 import os
 import csv
+import math
+
+CHARS_PER_TOKEN = 4
 
 class CSVLogger():
     def __init__(self, seed="test", name="log", log_dir="logs", headers=None):
@@ -50,3 +53,16 @@ def create_logger(name: str, log_dir: str = "logs", metadata=False, seed = 1234)
         logger.addHandler(file_handler)
     
     return logger
+
+def estimate_tokens(text: str) -> int:
+    """
+    A cheap token estimate, for when there is no tokenizer on hand.
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def parse_address(text: str) -> tuple[str, int]:
+    """
+    Parses "host:port" into an address for Listener and Client.
+    """
+    host, port = text.rsplit(":", 1)
+    return host, int(port)
@@ -1,7 +1,9 @@
 from multiprocessing import Process, Pipe
-from threading import Thread, Lock
+from threading import Thread, Lock, Condition
 from queue import Queue
-from multiprocessing.connection import Listener, Pipe, Connection
+from collections import deque
+from multiprocessing.connection import Listener, Pipe, Connection, wait, deliver_challenge, answer_challenge, AuthenticationError
+from multiprocessing.reduction import ForkingPickler
 import time
 import math
 from room import Room
@@ -24,12 +26,21 @@ class World(Process, ABC):
         llm (LLM): used if the server needs to do any sort of NLP - OPTIONAL
         cli (Connection): a way for the CLI to influence the server - OPTIONAL
         default_room (Room): the Room that new Actors are inserted into - OPTIONAL
+        listen (bool): accept Actors over the network, rather than only through accept_actor() - OPTIONAL
+        headless (bool): only write logs, with no console output, colour or artificial waits - OPTIONAL
+        characters (list[dict]): characters to hand out to NPC workers that register - OPTIONAL
+        npc_settings (dict): sent to NPC workers along with their characters - OPTIONAL
+        authkey (bytes): the key Actors must connect with, checked off the accept thread, so the
+            listener itself should have none - OPTIONAL
     """
 
     WAIT_TIME = 1 # wait period between "rounds"
     PRINT_COOLDOWN = 1 # just to make reading it less of a nightmare
+    TURN_TIMEOUT = 300 # seconds an actor has to act before their turn is passed
+    RECEIVE_TIMEOUT = 1 # seconds the receive loop waits before checking whether the game is over
+    HELLO_TIMEOUT = 10 # seconds a new connection has to send its info
 
-    def __init__(self, llm: LLM = None, cli: Connection = None, default_room: Room = None, turn_based = False, csv_logger = None, txt_logger = None, seed=1234, listener=None):
+    def __init__(self, llm: LLM = None, cli: Connection = None, default_room: Room = None, turn_based = False, csv_logger = None, txt_logger = None, seed=1234, listener=None, turn_timeout = TURN_TIMEOUT, pipeline = False, listen = True, headless = False, characters = None, npc_settings = None, authkey: bytes = None):
         super().__init__()
 
         self.llm = llm                      # LLM information
@@ -38,15 +49,23 @@ class World(Process, ABC):
 
         self.actors_lock = Lock()           # lock to access actors
         self.actors = {}                    # dictionary of actors
+        self.actors_joined = Condition()    # notified whenever an actor connects
         self.flagged_actors = []            # list of tuples (actor, reason)
 
-        if listener == None:
+        if not listen:
+            self.listener = None                # actors are attached in-process
+        elif listener == None:
             self.listener = Listener(ADDRESS)   # for new connections
         else:
             self.listener = listener
 
         self.print_queue = Queue()
 
+        # headless games skip the console and its pacing, and count what that saved
+        self.headless = headless
+        self.skipped_prints = 0
+        self.skipped_waits = 0.0
+
         # sets the default room
         if default_room == None:
             self.default_room = Room()
@@ -59,11 +78,22 @@ class World(Process, ABC):
         self.rooms_lock = Lock()
         self.rooms = {self.default_room.name: self.default_room}
 
+        # room state is synced to actors as numbered deltas, with a snapshot on entry or resync
+        self.room_seq = {}                  # room -> number of the last delta sent to it
+        self.room_votes = {}                # room -> the vote targets and state its actors were last sent
+
         self.logger = txt_logger
         self.csv_logger = csv_logger
 
         self.accept_connections = True
         self.connection_loop = Thread(target=self.new_connection_loop, daemon=True)
+
+        # one thread receives from every actor as messages arrive, and sorts them into inboxes
+        self.inboxes = {}                   # actor -> deque of unread messages
+        self.disconnected = set()           # actors whose connection has closed
+        self.inbox_changed = Condition()
+        self.wakeup_recv, self.wakeup_send = Pipe(duplex=False)
+        self.receive_loop = Thread(target=self.receive_loop, daemon=True)
         self.print_loop = Thread(target=self.print_loop, daemon=True)
 
         self.valid_vote_targets = []
@@ -72,18 +102,36 @@ class World(Process, ABC):
         self.end = False
         self.turn_based = turn_based
 
-    def get_new_messages(self) -> list[dict]:
+        self.turn_timeout = turn_timeout
+        self.pipeline = pipeline            # prefill the next actor's prompt during the current turn
+        self.turn_count = 0                 # stamps act tokens, so late replies can be recognized
+
+        # characters not yet handed to a worker, for NPCs hosted on other machines
+        self.unassigned = list(characters or [])
+        self.npc_settings = npc_settings or {}
+
+        # not self.authkey, which is the Process' own key
+        self.server_authkey = authkey
+
+    def get_new_messages(self, timeout: float = 0) -> list[dict]:
+        """
+        Takes every unread message, from every actor.
+
+        Args:
+            timeout (float): seconds to wait for a message, if there are none yet - OPTIONAL
+
+        Returns:
+            list[ActionMessage]: each message carries the sender's name under "actor"
+        """
         new_messages = []
 
-        # check each actor for messages & forward
-        with self.actors_lock:
-            for actor in self.actors:
-                msg = self.try_recv(self.actors[actor]["conn"])
-                if not msg:
-                    pass
-                else:
-                    msg["actor"] = actor
-                    new_messages.append(msg)
+        with self.inbox_changed:
+            if not any(self.inboxes.values()) and timeout > 0:
+                self.inbox_changed.wait(timeout)
+
+            for inbox in self.inboxes.values():
+                new_messages.extend(inbox)
+                inbox.clear()
 
         return new_messages
 
@@ -98,19 +146,44 @@ class World(Process, ABC):
                         if message["role"] == "user":
                             message = message["content"]
                         elif message["role"] == "system":
-                            message = f"\033[1mSYSTEM:\033[0m {message['content']}"
+                            message = f"{self.paint('SYSTEM:', Style.BRIGHT)} {message['content']}"
                     except:
                         pass
                 self.logger.info(message)
             elif self.logger != None:
                 raise TypeError("The provided logger is not a Logger")
             
-            if print:
+            if print and self.headless:
+                self.skipped_prints += 1
+            elif print:
                 self.print_queue.put(message)
 
         except Exception as e:
             traceback.print_exception(e)
 
+    def paint(self, text: str, *styles: str) -> str:
+        """
+        Wraps text in colorama styles, or leaves it plain when headless.
+        """
+        if self.headless or not any(styles):
+            return text
+        return "".join(style for style in styles if style) + text + Style.RESET_ALL
+
+    def pause(self, seconds: float):
+        """
+        Waits between rounds, so a watching human can keep up. Headless games don't.
+        """
+        if self.headless:
+            self.skipped_waits += seconds
+        else:
+            time.sleep(seconds)
+
+    def time_saved(self) -> float:
+        """
+        Seconds of waiting a headless game skipped: its pauses, and a PRINT_COOLDOWN per unprinted line.
+        """
+        return self.skipped_waits + self.skipped_prints * self.PRINT_COOLDOWN
+
     def print_loop(self):
         """
         Limits prints to one every PRINT_COOLDOWN seconds.
@@ -127,7 +200,7 @@ class World(Process, ABC):
                             if message["role"] == "user":
                                 message = message["content"]
                             elif message["role"] == "system":
-                                message = f"\033[1mSYSTEM:\033[0m {message['content']}"
+                                message = f"{self.paint('SYSTEM:', Style.BRIGHT)} {message['content']}"
                         except:
                             pass
 
@@ -140,45 +213,200 @@ class World(Process, ABC):
 
     def new_connection_loop(self):
         """
-        Adds new actors to the list. Upon connection, the next message from the actor must be its name.
-        
-        Duplicate names are not allowed.
+        Adds new actors to the list as they connect.
         """
         while self.accept_connections:
-            conn = self.listener.accept()
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                break
 
+            # a slow, silent or unauthorized client mustn't hold up anyone else's connection
+            Thread(target=self.greet, args=(conn,), daemon=True).start()
+
+    def greet(self, conn: Connection):
+        """
+        Authenticates a new connection, and accepts it as an actor once it sends its info.
+        """
+        try:
+            if self.server_authkey:
+                deliver_challenge(conn, self.server_authkey)
+                answer_challenge(conn, self.server_authkey)
 
+            if not conn.poll(self.HELLO_TIMEOUT):
+                conn.close()
+                return
             actor = conn.recv()
+        except (AuthenticationError, EOFError, OSError) as e:
+            if self.logger:
+                self.logger.warning(f"Turned away a connection: {e}")
+            conn.close()
+            return
 
-            if actor["name"] in self.actors:
-                conn.close() # TODO: error response for retries
+        if not isinstance(actor, dict) or not (actor.get("worker") or "name" in actor):
+            conn.close()
+            return
 
-            else:
+        self.accept_actor(conn, actor)
+
+    def accept_actor(self, conn: Connection, actor: dict = None):
+        """
+        Adds an actor to the default room, whether it connected over the network or a Pipe.
+        The first message from the actor must be its info.
+        
+        Duplicate names are not allowed.
+
+        Args:
+            conn (Connection): the world's end of the actor's connection
+            actor (dict): the actor's info, if it was already received, e.g. by a GameHost - OPTIONAL
+        """
+        if actor == None:
+            actor = conn.recv()
+
+        if actor.get("worker"):
+            self.register_worker(conn, actor)
+            return
+
+        if actor["name"] in self.actors:
+            conn.close() # TODO: error response for retries
+
+        else:
+            with self.inbox_changed:
+                self.inboxes[actor["name"]] = deque()
+                self.disconnected.discard(actor["name"])
+
+            with self.actors_lock:
                 self.actors[actor["name"]] = actor
                 actor["conn"] = conn
                 actor["room"] = self.default_room.name
-                conn.send(self.default_room.state())
-                self.move_actor_to_room(actor["name"], self.default_room.name, notify = False)
+            conn.send(self.default_room.state())
+            self.move_actor_to_room(actor["name"], self.default_room.name, notify = False)
+
+            self.wake_receive_loop()
+
+            with self.actors_joined:
+                self.actors_joined.notify_all()
 
-    def try_recv(self, conn: Connection):
+    def register_worker(self, conn: Connection, worker: dict):
         """
-        Safely attempts a recv.
+        Hands characters to an NPC worker, which starts an NPC for each and connects them
+        like any other actor.
 
         Args:
-            conn (Connection): connection to test
-        
-        Returns:
-            ActionMessage: may be None if the poll fails
+            conn (Connection): the world's end of the worker's connection
+            worker (dict): the worker's registration, with how many NPCs it will host under "slots"
         """
+        with self.actors_lock:
+            assigned = self.unassigned[:worker["slots"]]
+            self.unassigned = self.unassigned[worker["slots"]:]
+
         try:
-            if conn.poll():
-                response = conn.recv()
-                return response
-            return None
+            conn.send({"characters": assigned, "settings": self.npc_settings})
         except Exception as e:
-            self.logger.error(f"Failed to poll connection, creating leave message for actor. Error message: {e}")
-            return {"action": "leave", "reason": "disconnect", "room": ""}
+            self.logger.error(f"Failed to assign characters to worker {worker.get('name')}: {e}")
+            with self.actors_lock:
+                self.unassigned = assigned + self.unassigned
+        else:
+            self.log(f"Worker {worker.get('name')} is hosting {[character['name'] for character in assigned]}", print=False)
+        finally:
+            conn.close()
+
+    def wait_for_actors(self, count: int, timeout: float = None) -> bool:
+        """
+        Blocks until count actors have connected, then stops accepting connections.
+
+        Returns:
+            bool: False if the timeout passed first
+        """
+        with self.actors_joined:
+            joined = self.actors_joined.wait_for(lambda: len(self.actors) >= count, timeout)
+
+        self.accept_connections = False
+        return joined
+
+    def sort_actors(self):
+        """
+        Puts the actors, and every room's occupants, in name order rather than the
+        order they happened to connect in, so a seeded game plays out the same way
+        every time. Every actor is sent a fresh snapshot of their room.
+        """
+        with self.rooms_lock:
+            with self.actors_lock:
+                ordered = sorted(self.actors.items())
+                self.actors.clear()
+                self.actors.update(ordered)
+
+            for room in self.rooms.values():
+                ordered = sorted(room.actors.items())
+                room.actors.clear()
+                room.actors.update(ordered)
+
+        for actor in self.actors:
+            self.send_room_snapshot(actor)
+
+    def wake_receive_loop(self):
+        """
+        Makes the receive loop pick up a changed set of connections.
+        """
+        try:
+            self.wakeup_send.send(None)
+        except OSError:
+            pass
+
+    def receive_loop(self):
+        """
+        Waits on every actor's connection at once, and files each message in the
+        sender's inbox as soon as it arrives.
+        """
+        while not self.end:
+            with self.actors_lock:
+                conns = {self.actors[actor]["conn"]: actor for actor in self.actors if actor not in self.disconnected}
+
+            try:
+                ready = wait(list(conns) + [self.wakeup_recv], self.RECEIVE_TIMEOUT)
+            except (OSError, ValueError):
+                # a connection was closed while building the list, so build it again
+                continue
+
+            for conn in ready:
+                if conn == self.wakeup_recv:
+                    self.wakeup_recv.recv()
+                    continue
+
+                actor = conns[conn]
+
+                try:
+                    msg = conn.recv()
+                    msg["actor"] = actor
+                except (EOFError, OSError) as e:
+                    if self.logger:
+                        self.logger.error(f"Lost connection to {actor}: {e}")
+                    with self.inbox_changed:
+                        self.disconnected.add(actor)
+                    msg = {"action": "leave", "reason": "disconnect", "room": "", "actor": actor}
+
+                if self.handle_now(actor, msg):
+                    continue
+
+                with self.inbox_changed:
+                    self.inboxes[actor].append(msg)
+                    self.inbox_changed.notify_all()
     
+    def handle_now(self, actor: str, msg: dict) -> bool:
+        """
+        Handles messages that can't wait for whoever is reading the actor's inbox.
+        Runs on the receive loop, as each message arrives.
+
+        Returns:
+            bool: True if the message was handled, and shouldn't go in the inbox
+        """
+        # an actor that missed a room delta needs a snapshot, whoever's turn it is
+        if msg.get("action") == "resync":
+            self.send_room_snapshot(actor)
+            return True
+
+        return False
+
     def send_to_actor(self, actor : str, message: dict | str, type = "context"):
         """
         Attempts to send a message to the designated Actor
@@ -196,12 +424,82 @@ class World(Process, ABC):
         except Exception as e:
             self.logger.error(f"Failed to send message to actor {actor}: {e}")
 
-    def send_act_token(self, actor: str):
+    def send_act_token(self, actor: str) -> int:
+        """
+        Gives an actor the turn.
+
+        Returns:
+            int: the turn number, which the actor's reply will carry
+        """
+        self.turn_count += 1
         try:
             with self.actors_lock:
-                self.actors[actor]["conn"].send({"type": "act_token"})
+                self.actors[actor]["conn"].send({"type": "act_token", "turn": self.turn_count})
         except Exception as e:
             self.logger.error(f"Failed to send act token to actor {actor}: {e}")
+        return self.turn_count
+
+    def await_action(self, actor: str, turn: int, timeout: float = None) -> dict | None:
+        """
+        Waits for an actor's reply to the given turn. Late replies to earlier turns are dropped.
+
+        Args:
+            actor (str): the name of the Actor
+            turn (int): the turn number from send_act_token
+            timeout (float): seconds to wait, defaults to turn_timeout - OPTIONAL
+
+        Returns:
+            ActionMessage: None if the actor missed the deadline or disconnected
+        """
+        if timeout == None:
+            timeout = self.turn_timeout
+
+        return self.await_message(actor, lambda msg: msg.get("turn") == turn, timeout)
+
+    def await_message(self, actor: str, accept, timeout: float) -> dict | None:
+        """
+        Waits for a message from an actor that passes accept. Other messages are dropped.
+
+        Args:
+            actor (str): the name of the Actor
+            accept (Callable[[dict], bool]): whether a message is the one being waited for
+            timeout (float): seconds to wait
+
+        Returns:
+            ActionMessage: None if the deadline passed, the actor disconnected or the game ended
+        """
+        deadline = time.time() + timeout
+
+        with self.inbox_changed:
+            while True:
+                inbox = self.inboxes.get(actor)
+
+                while inbox:
+                    msg = inbox.popleft()
+                    if accept(msg):
+                        return msg
+                    self.logger.warning(f"Dropped a late message from {actor}: {msg}")
+
+                if inbox == None or actor in self.disconnected:
+                    self.logger.error(f"Lost connection to {actor} while waiting on them.")
+                    return None
+
+                # the receive loop has stopped, so nothing more is coming
+                if self.end:
+                    return None
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+
+                self.inbox_changed.wait(remaining)
+
+    def send_prefill_message(self, actor: str):
+        try:
+            with self.actors_lock:
+                self.actors[actor]["conn"].send({"type": "prefill"})
+        except Exception as e:
+            self.logger.error(f"Failed to send prefill message to actor {actor}: {e}")
 
     def send_team_message(self, actor: str, team):
         try:
@@ -263,21 +561,36 @@ class World(Process, ABC):
             except Exception as e:
                 self.logger.error(f"Failed to send message to room {room}: {e}")            
 
+    def send_to_actors(self, actors, message: dict | str, type = "context"):
+        """
+        Sends the same message to several Actors. The message is pickled once, and
+        the same bytes are written to every connection, under one lock acquisition.
+
+        Args:
+            actors (Iterable[str]): the names of the Actors
+            message (GPTMessage): a message ready to send to an LLM
+            type (str): determines the function the Actors should call - OPTIONAL
+        """
+        if isinstance(message, str) and type == "context":
+            message = {"role": "system", "content": message}
+        payload = ForkingPickler.dumps({"type": type, "content": message})
+
+        with self.actors_lock:
+            for actor in actors:
+                try:
+                    self.actors[actor]["conn"].send_bytes(payload)
+                except Exception as e:
+                    self.logger.error(f"Failed to send message to actor {actor}: {e}")
+
     def broadcast(self, message: str | dict, type = "context"):
-        for actor in self.actors:
-            self.send_to_actor(actor, message, type)
+        self.send_to_actors(list(self.actors), message, type)
 
     def send_to_room(self, room: str | Room, message: dict, type = "context", verbose = True, excludes = []):
         with self.rooms_lock:
             try:
                 if isinstance(room, str):
-                    for actor in self.rooms[room].actors:
-                        if actor not in excludes:
-                            self.send_to_actor(actor, message, type)
-                elif isinstance(room, Room):
-                    for actor in room.actors:
-                        if actor not in excludes:
-                            self.send_to_actor(actor, message, type)
+                    room = self.rooms[room]
+                self.send_to_actors([actor for actor in room.actors if actor not in excludes], message, type)
                 if verbose:
                     self.log(message)
             except Exception as e:
@@ -287,10 +600,6 @@ class World(Process, ABC):
         if room in self.rooms and actor in self.actors:
             old_room = self.actors[actor]["room"]
             self.actors[actor]["room"] = room
-            if old_room in self.rooms:
-                self.rooms[old_room].remove_actor(actor)
-            
-            self.send_to_actor(actor, self.rooms[room].state(), "room")
 
             data = {
                 "name": actor,
@@ -298,27 +607,79 @@ class World(Process, ABC):
                 "status": self.actors[actor]["status"]
             }
 
-            self.rooms[room].add_actor(data)
+            with self.rooms_lock:
+                if old_room in self.rooms and actor in self.rooms[old_room].actors:
+                    self.rooms[old_room].remove_actor(actor)
+                    self.send_room_delta(old_room, {"op": "left", "name": actor})
+
+                if actor not in self.rooms[room].actors:
+                    self.send_room_delta(room, {"op": "joined", "actor": data})
+                    self.rooms[room].add_actor(data)
+
+            self.send_room_snapshot(actor)
+
             arrival_message = f"{actor} has entered the {room}!"
 
             if notify:
                 self.send_to_room(room, {"role": "system", "content": arrival_message}, verbose=verbose)
-                self.send_to_room(room, self.rooms[room].state(), "room", verbose=False)
+
+    # NOTE: this is NOT THREAD SAFE, and is intended to be called already within rooms_lock
+    def send_room_delta(self, room: str, delta: dict):
+        """
+        Tells everyone in a room about one change to it. Deltas are numbered per room,
+        so an actor that misses one can tell, and ask for a snapshot.
+
+        Args:
+            room (str): the room's name
+            delta (dict): the change, e.g. {"op": "joined", "actor": {...}} or {"op": "vote", "voter": "Bob", "target": "Alice"}
+        """
+        self.room_seq[room] = self.room_seq.get(room, 0) + 1
+        delta["seq"] = self.room_seq[room]
+        delta["room"] = room
+        self.send_to_actors(list(self.rooms[room].actors), delta, "room_delta")
+
+    def send_room_snapshot(self, actor: str):
+        """
+        Sends an actor the full state of their room, as of its latest delta.
+        """
+        with self.rooms_lock:
+            room = self.actors[actor]["room"]
+            votes = self.room_votes.get(room, {"vote_targets": [], "vote_state": None})
+
+            snapshot = {
+                "seq": self.room_seq.get(room, 0),
+                "room": self.rooms[room].state(),
+                "vote_targets": votes["vote_targets"],
+                "vote_state": votes["vote_state"]
+            }
+
+            self.send_to_actor(actor, snapshot, "room_snapshot")
+
+    def send_votes_reset(self, room: str):
+        """
+        Sends a room the current vote targets and vote state, e.g. at the start of a phase.
+        """
+        with self.rooms_lock:
+            self.room_votes[room] = {"vote_targets": list(self.valid_vote_targets), "vote_state": dict(self.voters)}
+            self.send_room_delta(room, {"op": "votes_reset", **self.room_votes[room]})
+
+    def send_vote(self, room: str, voter: str, target: str):
+        """
+        Tells a room that one vote has changed.
+        """
+        with self.rooms_lock:
+            votes = self.room_votes.setdefault(room, {"vote_targets": list(self.valid_vote_targets), "vote_state": {}})
+            votes["vote_state"][voter] = target
+            self.send_room_delta(room, {"op": "vote", "voter": voter, "target": target})
 
     # NOTE: this is NOT THREAD SAFE, and is intended to be called already within a lock
     def speak(self, actor: str, content: str, colour = None, exclude_speaker = True, reason = None):
         if content and content != "...":
             output_plain = f"{actor} says, \"{content}\""
-            if colour:
-                output_fancy = colour + actor + Style.RESET_ALL + f" says, \"{content}\""
-            else:
-                output_fancy = output_plain
+            output_fancy = self.paint(actor, colour) + f" says, \"{content}\""
         else:
             output_plain = f"{actor} is quiet."
-            if colour:
-                output_fancy = colour + actor + Style.RESET_ALL + f" is quiet."
-            else:
-                output_fancy = output_plain
+            output_fancy = self.paint(actor, colour) + " is quiet."
 
         if reason:
             output_fancy += f" Reason: {reason}"
@@ -346,10 +707,7 @@ class World(Process, ABC):
         output_plain = f"{actor} yells, \"{content.upper()}\""
         self.send_to_room(self.actors[actor]["room"], {"role": "user", "content": output_plain}, verbose=False)
 
-        if colour:
-            output_fancy = colour + actor + Style.RESET_ALL + " yells, " + Style.BRIGHT + "\"" + content.upper() + "\"" + Style.RESET_ALL
-        else:
-            output_fancy = f"{actor} yells, " + Style.BRIGHT + "\"" + content.upper() + "\"" + Style.RESET_ALL
+        output_fancy = self.paint(actor, colour) + " yells, " + self.paint("\"" + content.upper() + "\"", Style.BRIGHT)
         
         self.log(output_fancy)
 
@@ -397,23 +755,27 @@ class World(Process, ABC):
                     reason = flag[1]
                     room = self.actors[actor]["room"]
 
-                    self.actors[actor]["conn"].close()
-                    self.actors.pop(actor, None)
+                    with self.actors_lock:
+                        self.actors[actor]["conn"].close()
+                        self.actors.pop(actor, None)
+                    self.wake_receive_loop()
 
                     if reason == "killed":
                         output = f"{actor} has been killed!"
+                        op = "died"
                     else:
                         output = f"{actor} has left the room!"
+                        op = "left"
                     
-                    self.rooms[room].remove_actor(actor)
+                    with self.rooms_lock:
+                        self.rooms[room].remove_actor(actor)
+                        self.send_room_delta(room, {"op": op, "name": actor})
 
                     if verbose:
                         self.send_to_room(room, {"role": "user", "content": output})
                     
                 except Exception as e:
                     self.logger.warning(e)
-            for room in self.rooms:
-                self.send_to_room(room, self.rooms[room].state(), "room", verbose=False)
 
             self.flagged_actors = []
 
@@ -445,7 +807,7 @@ class World(Process, ABC):
                 #        message += f"\n\t\t{voter}: {self.voters[voter]}"
 
                 self.log(message)
-                self.send_to_room(self.actors[actor]["room"], message={"content": self.voters}, type="vote_state", verbose=False)
+                self.send_vote(self.actors[actor]["room"], actor, target)
 
 
     def resolve_majority_vote(self, tiebreaker = False) -> str | None:
@@ -507,8 +869,12 @@ class World(Process, ABC):
     
     def run(self):
         random.seed(self.seed)
-        self.connection_loop.start()
-        self.print_loop.start()
+
+        if self.listener != None:
+            self.connection_loop.start()
+        self.receive_loop.start()
+        if not self.headless:
+            self.print_loop.start()
 
         self.setup()          
 
@@ -519,7 +885,8 @@ class World(Process, ABC):
         
         self.cleanup()
 
-        self.print_loop.join()
+        if not self.headless:
+            self.print_loop.join()
     
 if __name__ == "__main__":
     parent_conn, child_conn = Pipe()
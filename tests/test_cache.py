@@ -0,0 +1,56 @@
+import sys
+import os
+import itertools
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+import cache
+from cache import ResponseCache, request_key
+
+MESSAGES = [{"role": "system", "content": "You are a villager."}, {"role": "user", "content": "Who do you vote for?"}]
+
+def test_request_key_is_stable():
+    key = request_key("llama3.1:8b", MESSAGES, {"type": "object", "required": ["action"]}, 42)
+
+    # dict key order doesn't change the request
+    assert request_key("llama3.1:8b", MESSAGES, {"required": ["action"], "type": "object"}, 42) == key
+    assert request_key("llama3.1:8b", [dict(reversed(list(message.items()))) for message in MESSAGES], {"type": "object", "required": ["action"]}, 42) == key
+
+def test_request_key_changes_with_the_request():
+    key = request_key("llama3.1:8b", MESSAGES, None, 42)
+
+    assert request_key("llama3.1:8b", MESSAGES, None, 43) != key
+    assert request_key("qwen3:8b", MESSAGES, None, 42) != key
+    assert request_key("llama3.1:8b", MESSAGES[:1], None, 42) != key
+    assert request_key("llama3.1:8b", MESSAGES, None, 42, think=True) != key
+
+def test_memory_evicts_least_recently_used(tmp_path):
+    responses = ResponseCache(str(tmp_path / "cache.sqlite"), memory_size=2)
+
+    responses.put("a", ["A"])
+    responses.put("b", ["B"])
+    responses.get("a")
+    responses.put("c", ["C"])
+
+    assert list(responses.memory) == ["a", "c"]
+
+    # still on disk, and remembered again once read
+    assert responses.get("b") == ["B"]
+    assert list(responses.memory) == ["c", "b"]
+
+def test_disk_evicts_least_recently_used(tmp_path, monkeypatch):
+    # a clock that always moves, so last_used never ties
+    clock = itertools.count()
+    monkeypatch.setattr(cache.time, "time", lambda: next(clock))
+
+    path = str(tmp_path / "cache.sqlite")
+    responses = ResponseCache(path, memory_size=0, max_entries=2)
+
+    responses.put("a", ["A"])
+    responses.put("b", ["B"])
+    responses.get("a")
+    responses.put("c", ["C"])
+
+    reopened = ResponseCache(path)
+    assert reopened.get("a") == ["A"]
+    assert reopened.get("b") == None
+    assert reopened.get("c") == ["C"]
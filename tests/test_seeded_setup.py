@@ -0,0 +1,70 @@
+import sys
+import os
+import csv
+import json
+import random
+from multiprocessing import Pipe
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+sys.path.append(os.path.join(ROOT, 'src'))
+sys.path.append(os.path.join(ROOT, 'game'))
+from wolfworld import WolfWorld
+from wolfnpc import WolfNPC
+
+SEED = 42
+
+class RowLogger:
+    """
+    Stands in for a WolfLogger, keeping rows in memory instead of writing a csv.
+    """
+    def __init__(self):
+        self.rows = []
+
+    def log(self, **kwargs):
+        self.rows.append(kwargs)
+
+def first_prompts(join_order: list[int]) -> dict:
+    """
+    Sets up a seeded game whose NPCs connect in the given order, and returns every
+    NPC's first prompt.
+    """
+    with open(os.path.join(ROOT, 'game/npcs.csv'), mode='r', newline='', encoding='utf-8') as file:
+        characters = [row for _, row in zip(range(WolfWorld.PLAYER_COUNT), csv.DictReader(file))]
+
+    world = WolfWorld(csv_logger=RowLogger(), seed=SEED, listen=False, headless=True)
+    npcs = {}
+
+    for i in join_order:
+        npc = WolfNPC(name=characters[i]["name"],
+                      personality=characters[i]["personality"],
+                      description=characters[i]["description"],
+                      gender=characters[i]["gender"],
+                      csv_logger=RowLogger(),
+                      strategy="window",
+                      seed=SEED)
+        world_conn, npc.conn = Pipe()
+        world.accept_actor(world_conn, npc.dict_server())
+        npc.room_info = npc.conn.recv()
+        npcs[npc.name] = npc
+
+    random.seed(SEED)
+    world.setup()
+
+    prompts = {}
+
+    for name, npc in npcs.items():
+        while npc.conn.poll():
+            npc.handle_message(npc.conn.recv())
+        prompts[name] = json.dumps(npc.gen_system_prompt(), ensure_ascii=False)
+
+    return prompts
+
+def test_seeded_setups_give_identical_first_prompts(monkeypatch):
+    # the world and npcs load their rooms and system messages relative to the repo root
+    monkeypatch.chdir(ROOT)
+
+    in_order = first_prompts(list(range(WolfWorld.PLAYER_COUNT)))
+    reversed_order = first_prompts(list(reversed(range(WolfWorld.PLAYER_COUNT))))
+
+    assert in_order == reversed_order
@@ -10,11 +10,17 @@ import random
 
 sys.path.append(os.path.join(os.path.dirname(__file__), 'game'))
 from wolfworld import WolfWorld
-from wolflogger import WolfLogger
+from wolflogger import WolfLogger, recorded_seed
 from wolfnpc import WolfNPC
 
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
-from utils import create_logger
+from utils import create_logger, parse_address
+from broker import InferenceBroker
+from llm import LLM
+from cache import DEFAULT_CACHE_PATH
+from residency import ModelResidency
+from runtime import ActorRuntime
+from host import GameHost
 
 NPCS_PATH = "game/npcs.csv"
 
@@ -32,6 +38,9 @@ if __name__ == "__main__":
     elif "-ws" in sys.argv:
         json_file = open("config/window-summary.json")
         experiment = "ws"
+    elif "-rr" in sys.argv:
+        json_file = open("config/retrieval-retrieval.json")
+        experiment = "rr"
     elif "-o" in sys.argv:
         json_file = open("config/online.json")
         experiment = "o"
@@ -48,11 +57,118 @@ if __name__ == "__main__":
     else:
         loop_count = 1
 
+    if "-t" in sys.argv:
+        try:
+            turn_timeout = float(sys.argv[sys.argv.index("-t") + 1])
+        except (IndexError, ValueError):
+            print("Error: -t must be followed by a number of seconds.")
+            sys.exit(1)
+    else:
+        turn_timeout = WolfWorld.TURN_TIMEOUT
+
+    if "-s" in sys.argv:
+        try:
+            fixed_seed = int(sys.argv[sys.argv.index("-s") + 1])
+        except (IndexError, ValueError):
+            print("Error: -s must be followed by an integer.")
+            sys.exit(1)
+    else:
+        fixed_seed = None
+
+    # replays a logged game, pinned to its seed, without a model server
+    if "--replay" in sys.argv:
+        try:
+            replay_path = sys.argv[sys.argv.index("--replay") + 1]
+
+            # -s games are logged under their timestamp, so the log's own record of the seed wins
+            fixed_seed = recorded_seed(replay_path)
+            if fixed_seed == None:
+                fixed_seed = int(os.path.basename(replay_path).split(" ")[0])
+        except (IndexError, ValueError, KeyError, OSError):
+            print("Error: --replay must be followed by a WolfLogger csv, named '<seed> <experiment>.csv'.")
+            sys.exit(1)
+    else:
+        replay_path = None
+
+    if "--recorded-latency" in sys.argv:
+        replay_latency = "recorded"
+    else:
+        replay_latency = "zero"
+
+    if "-c" in sys.argv:
+        cache_path = DEFAULT_CACHE_PATH
+    else:
+        cache_path = None
+
+
+    # runs each game's world and npcs as threads in one process, rather than nine processes
+    threaded = "--threads" in sys.argv
+
+    # only writes the logs: no console output, colour or pauses for a human to keep up
+    headless = "--headless" in sys.argv
 
     config = json.load(json_file)
     json_file.close()
 
-    sys_message_file = "npc_system_message_turn_based.txt"
+    # one inference broker shared by every game in this run
+    if "-b" in sys.argv:
+        broker = InferenceBroker()
+        broker.start()
+        broker_address = broker.address
+    else:
+        broker_address = None
+
+    # every awake npc acts whenever it likes, instead of taking turns
+    if "--real-time" in sys.argv:
+        turn_based = False
+        sys_message_file = "npc_system_message_real_time.txt"
+    else:
+        turn_based = True
+        sys_message_file = "npc_system_message_turn_based.txt"
+
+    # real-time npcs wait a random few seconds between actions, rather than reacting at once
+    pacing = "--pacing" in sys.argv
+
+    # one server process and listener runs every game, up to --max-games at a time
+    hosting = "--host" in sys.argv
+
+    if "--max-games" in sys.argv:
+        try:
+            max_games = int(sys.argv[sys.argv.index("--max-games") + 1])
+        except (IndexError, ValueError):
+            print("Error: --max-games must be followed by an integer.")
+            sys.exit(1)
+    else:
+        max_games = GameHost.MAX_GAMES
+
+    # npcs on other machines need the key; a local run can make up its own
+    if "--authkey" in sys.argv:
+        try:
+            authkey = sys.argv[sys.argv.index("--authkey") + 1].encode()
+        except IndexError:
+            print("Error: --authkey must be followed by a key.")
+            sys.exit(1)
+    elif os.environ.get("WOLF_AUTHKEY"):
+        authkey = os.environ["WOLF_AUTHKEY"].encode()
+    else:
+        authkey = None
+
+    # listens for npc_worker.py processes, instead of starting npcs here
+    if "--serve" in sys.argv:
+        try:
+            serve_address = parse_address(sys.argv[sys.argv.index("--serve") + 1])
+        except (IndexError, ValueError):
+            print("Error: --serve must be followed by host:port.")
+            sys.exit(1)
+
+        if authkey == None:
+            print("Error: --serve needs an --authkey, or WOLF_AUTHKEY to be set.")
+            sys.exit(1)
+    else:
+        serve_address = None
+
+    if authkey == None:
+        authkey = os.urandom(16)
 
     player_list = []
 
@@ -60,36 +176,45 @@ if __name__ == "__main__":
         reader = csv.DictReader(file)
         npc_list = [row for _, row in zip(range(WolfWorld.PLAYER_COUNT), reader)]
 
-    for run_num in range(1,loop_count+1):
-        timestamp = datetime.now()
-        ts_int = int(timestamp.strftime('%Y%m%d%H%M%S'))
-        random.seed(ts_int)
-
-        csv_logger = WolfLogger(experiment, seed=ts_int)
-        txt_logger = create_logger("World", seed=ts_int)
+    for npc in npc_list:
+        if not isinstance(npc["can_speak"], bool):
+            if npc["can_speak"].upper() == "TRUE":
+                npc["can_speak"] = True
+            else:
+                npc["can_speak"] = False
 
+    def new_world(seed, csv_logger, txt_logger, listener = None, listen = True, characters = None, npc_settings = None) -> WolfWorld:
+        # nothing to load when replaying a log, and served npcs run their models on their workers' machines
+        if replay_path or serve_address:
+            residency = None
+        else:
+            residency = ModelResidency(config["game_model"], config["summary_model"], config.get("residency", "pinned"))
 
-        # create and start server
         parent_conn, child_conn = Pipe()
-        listener = Listener(("localhost", 0))
 
-        world = WolfWorld(cli=child_conn, 
-                          csv_logger=csv_logger,
-                          txt_logger=txt_logger,
-                          wolf_strategy=config["wolf_strategy"], 
-                          village_strategy=config["village_strategy"],
-                          seed=ts_int,
-                          listener=listener)
-        world.start()
+        return WolfWorld(cli=child_conn, 
+                         csv_logger=csv_logger,
+                         txt_logger=txt_logger,
+                         wolf_strategy=config["wolf_strategy"], 
+                         village_strategy=config["village_strategy"],
+                         seed=seed,
+                         listener=listener,
+                         turn_timeout=turn_timeout,
+                         residency=residency,
+                         pipeline=config.get("pipeline", False),
+                         llm=LLM(model=config["game_model"], seed=seed, broker=broker_address, logger=txt_logger),
+                         listen=listen,
+                         headless=headless,
+                         turn_based=turn_based,
+                         characters=characters,
+                         npc_settings=npc_settings,
+                         max_summaries=config.get("max_summaries", WolfWorld.MAX_SUMMARIES),
+                         authkey=authkey)
 
-        for npc in npc_list:
-            #self.log(npc)
-            if not isinstance(npc["can_speak"], bool):
-                if npc["can_speak"].upper() == "TRUE":
-                    npc["can_speak"] = True
-                else:
-                    npc["can_speak"] = False
+    def new_npcs(seed, csv_logger, txt_logger, address = None, game = None) -> list[WolfNPC]:
+        npcs = []
 
+        for npc in npc_list:
             bot_player = WolfNPC(name=npc["name"],
                                  personality=npc["personality"],
                                  description=npc["description"],
@@ -98,11 +223,111 @@ if __name__ == "__main__":
                                  summary_model=config["summary_model"],
                                  logger=txt_logger,
                                  csv_logger=csv_logger,
-                                 seed=ts_int,
-                                 address=listener.address
+                                 seed=seed,
+                                 address=address,
+                                 broker=broker_address,
+                                 cache_path=cache_path,
+                                 replay=replay_path,
+                                 replay_latency=replay_latency,
+                                 prompt_layout=config.get("prompt_layout", "classic"),
+                                 sys_message_file=sys_message_file,
+                                 turn_based=turn_based,
+                                 pacing=pacing,
+                                 game=game,
+                                 authkey=authkey
                                  )
-            bot_player.start()
-            player_list.append(bot_player)
+            npcs.append(bot_player)
+
+        return npcs
+
+    if hosting:
+        timestamp = datetime.now()
+        ts_int = int(timestamp.strftime('%Y%m%d%H%M%S'))
+        # every game's npcs connect at once, and a client dropped from a full
+        # accept queue waits on the authkey challenge forever. The host checks
+        # the key itself, off its accept thread.
+        listener = Listener(("localhost", 0), backlog=WolfWorld.PLAYER_COUNT * loop_count)
+
+        # every game gets its own logs, named by timestamp plus its game number
+        games = {}
+        for run_num in range(1, loop_count+1):
+            log_seed = ts_int + run_num - 1
+
+            if fixed_seed != None:
+                seed = fixed_seed
+            else:
+                seed = log_seed
+
+            games[str(run_num)] = (seed, WolfLogger(experiment, seed=log_seed), create_logger(f"World {log_seed}", seed=log_seed))
+
+        host = GameHost(listener,
+                        lambda game: new_world(*games[game], listen=False),
+                        games.keys(),
+                        authkey=authkey,
+                        max_games=max_games,
+                        total_games=loop_count)
+        host.start()
+
+        for game, (seed, csv_logger, txt_logger) in games.items():
+            for bot_player in new_npcs(seed, csv_logger, txt_logger, listener.address, game):
+                bot_player.start()
+                player_list.append(bot_player)
+
+        host.join()
+        sys.exit(0)
+
+    for run_num in range(1,loop_count+1):
+        timestamp = datetime.now()
+        ts_int = int(timestamp.strftime('%Y%m%d%H%M%S'))
+
+        # logs are always named by timestamp, but the game can be pinned to a seed
+        if fixed_seed != None:
+            seed = fixed_seed
+        else:
+            seed = ts_int
+        random.seed(seed)
+
+        csv_logger = WolfLogger(experiment, seed=ts_int)
+        # named per game, or every run would keep writing to the first run's log
+        txt_logger = create_logger(f"World {ts_int}", seed=ts_int)
+
+
+        # npc workers connect from wherever they run, and are handed their characters
+        if serve_address:
+            npc_settings = {"game_model": config["game_model"],
+                            "summary_model": config["summary_model"],
+                            "seed": seed,
+                            "log_seed": ts_int,
+                            "experiment": experiment,
+                            "prompt_layout": config.get("prompt_layout", "classic"),
+                            "sys_message_file": sys_message_file,
+                            "turn_based": turn_based,
+                            "pacing": pacing}
+
+            # workers register, then their npcs connect, so leave room for both.
+            # The world checks the key itself, off its accept thread.
+            world = new_world(seed, csv_logger, txt_logger, Listener(serve_address, backlog=WolfWorld.PLAYER_COUNT * 2), characters=npc_list, npc_settings=npc_settings)
+            world.start()
+            world.join()
+            continue
+
+        # create and start server
+        if threaded:
+            listener = None
+        else:
+            # room in the accept queue for every npc; the world checks their key
+            listener = Listener(("localhost", 0), backlog=WolfWorld.PLAYER_COUNT)
 
-        world.join()
+        world = new_world(seed, csv_logger, txt_logger, listener, listen=not threaded)
+        npcs = new_npcs(seed, csv_logger, txt_logger, listener.address if listener else None)
+        player_list += npcs
 
+        if threaded:
+            runtime = ActorRuntime([(world, npcs)])
+            runtime.start()
+            runtime.join()
+        else:
+            world.start()
+            for bot_player in npcs:
+                bot_player.start()
+            world.join()